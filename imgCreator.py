@@ -1,25 +1,146 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+import asyncio
 import base64
+import httpx
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 from dotenv import load_dotenv
+from PIL import Image
 import datetime
-import json
+import hashlib
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import re
+import shutil
 import sys
+import tempfile
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 load_dotenv()
 
-def generate_image(all_scenes: str, selected_scene: int, scene_script: str, scene_keyword: str, output_filename: Optional[str] = None, model: str = "dall-e-3") -> str:
-    if output_filename is None:
-        output_filename = f"scene_{selected_scene}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    
-    client = OpenAI()
+IMAGE_BACKENDS = ("dalle3", "sdxl-local")
+SDXL_MODEL_ID = "stabilityai/stable-diffusion-xl-base-1.0"
+
+# 구도 확인용 저해상도 미리보기 설정
+PREVIEW_IMAGE_SETTINGS = {"model": "dall-e-2", "size": "512x512", "quality": "standard"}
+
+# dall-e-2는 1000자를 넘는 프롬프트를 거부함
+DALLE2_PROMPT_MAX_CHARS = 1000
+
+# 갤러리 격자뷰용 썸네일 (원본 PNG 대비 수십 배 작음)
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_QUALITY = 80
+
+IMAGE_CACHE_DIR = "image_cache"
+IMAGE_CACHE_MAX_ENTRIES = 200
+
+# 제출 후 아직 회수하지 않은 Batch API 작업 정보 (배치 ID별 파일)
+BATCH_STATE_DIR = os.path.join(IMAGE_CACHE_DIR, "batches")
+_BATCH_ID_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+_cache_lock = threading.Lock()
+_local_pipelines = {}
+_client = None
+
+# 이미지 다운로드용 공유 세션 (씬 간 TCP/TLS 연결 재사용)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
+# 일시적인 오류(5xx, 네트워크, 타임아웃)만 지수 백오프로 재시도 (만료/권한 없는 URL 등 4xx는 즉시 실패)
+_CONNECTION_ERRORS = (APIConnectionError, InternalServerError, requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError)
+
+def _is_server_error(exc: BaseException) -> bool:
+    if isinstance(exc, _CONNECTION_ERRORS):
+        return True
+    if isinstance(exc, (requests.exceptions.HTTPError, httpx.HTTPStatusError)):
+        return exc.response is not None and exc.response.status_code >= 500
+    return False
+
+_retry_server_errors = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=2, max=30),
+    retry=retry_if_exception(_is_server_error),
+    reraise=True,
+)
+_retry_transient = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=2, max=30),
+    retry=retry_if_exception(lambda exc: _is_server_error(exc) or isinstance(exc, RateLimitError)),
+    reraise=True,
+)
+
+def _get_client() -> OpenAI:
+    # 요청마다 새 클라이언트를 만들지 않고 커넥션 풀을 재사용 (재시도는 tenacity가 전담)
+    global _client
+    _client = _client or OpenAI(timeout=60.0, max_retries=0)
+    return _client
+
+def _cache_key(model: str, size: str, quality: str, scene_number: int, scene_script: str, scene_keyword: str) -> str:
+    # 씬 번호도 키에 포함해 대사/키워드가 같은 두 씬이 캐시 파일을 공유하지 않도록 함
+    return hashlib.sha256(f"{model}|{size}|{quality}|{scene_number}|{scene_script}|{scene_keyword}".encode()).hexdigest()
+
+def _load_cache_index(cache_dir: str) -> dict:
+    index_path = os.path.join(cache_dir, "index.json")
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def _save_cache_index(cache_dir: str, index: dict) -> None:
+    with open(os.path.join(cache_dir, "index.json"), 'wb') as f:
+        f.write(orjson.dumps(index, option=orjson.OPT_INDENT_2))
 
-    image_prompt = f"""Create a webtoon/manhwa style illustration for scene {selected_scene} of an advertising comic.
+def thumbnail_path(image_path: str) -> str:
+    return str(Path(image_path).with_suffix(".thumb.webp"))
+
+def save_thumbnail(image_path: str) -> str:
+    thumb_path = thumbnail_path(image_path)
+    with Image.open(image_path) as img:
+        img.thumbnail(THUMBNAIL_SIZE)
+        img.save(thumb_path, "WEBP", quality=THUMBNAIL_QUALITY)
+    return thumb_path
+
+def _cache_lookup(key: str, output_filename: str, cache_dir: str = IMAGE_CACHE_DIR) -> bool:
+    cached_path = os.path.join(cache_dir, f"{key}.png")
+    with _cache_lock:
+        if not os.path.exists(cached_path):
+            return False
+        
+        shutil.copy(cached_path, output_filename)
+        save_thumbnail(output_filename)
+        
+        index = _load_cache_index(cache_dir)
+        if key in index:
+            index[key]["timestamp"] = time.time()
+            _save_cache_index(cache_dir, index)
+    return True
+
+def _cache_store(key: str, prompt: str, output_filename: str, cache_dir: str = IMAGE_CACHE_DIR) -> None:
+    with _cache_lock:
+        os.makedirs(cache_dir, exist_ok=True)
+        shutil.copy(output_filename, os.path.join(cache_dir, f"{key}.png"))
+        
+        index = _load_cache_index(cache_dir)
+        index[key] = {"timestamp": time.time(), "prompt": prompt}
+        
+        # 가장 오래 사용되지 않은 항목부터 제거 (LRU)
+        overflow = len(index) - IMAGE_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            for old_key in sorted(index, key=lambda k: index[k]["timestamp"])[:overflow]:
+                old_path = os.path.join(cache_dir, f"{old_key}.png")
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+                del index[old_key]
+        
+        _save_cache_index(cache_dir, index)
+
+def build_image_prompt(all_scenes: str, selected_scene: int, scene_script: str, scene_keyword: str) -> str:
+    return f"""Create a webtoon/manhwa style illustration for scene {selected_scene} of an advertising comic.
 
     CONTEXT - Full Story Flow:
     {all_scenes}
@@ -45,26 +166,56 @@ def generate_image(all_scenes: str, selected_scene: int, scene_script: str, scen
     - Character appearance should be consistent throughout the story
 
     Style: Clean Korean webtoon art, professional quality, detailed illustration, expressive characters, advertising comic aesthetic."""
-        
-    response = client.images.generate(
+
+def build_local_image_prompt(scene_script: str, scene_keyword: str) -> str:
+    # CLIP 텍스트 인코더는 77토큰까지만 읽으므로 전체 스토리 컨텍스트 없이 짧게 구성
+    return f"Korean webtoon manhwa style illustration, {scene_keyword}, {scene_script}, single panel, clean lines, vibrant colors, expressive Korean character"
+
+def build_prompt_for_model(model: str, all_scenes: str, selected_scene: int, scene_script: str, scene_keyword: str) -> str:
+    # dall-e-2에는 전체 스토리 컨텍스트 없이 짧은 프롬프트를 보냄
+    if model == "dall-e-2":
+        return build_local_image_prompt(scene_script, scene_keyword)[:DALLE2_PROMPT_MAX_CHARS]
+    return build_image_prompt(all_scenes, selected_scene, scene_script, scene_keyword)
+
+def generate_image(all_scenes: str, selected_scene: int, scene_script: str, scene_keyword: str, output_filename: Optional[str] = None, model: str = "dall-e-3", cache: bool = True, quality: str = "standard", size: str = "1024x1024") -> str:
+    if output_filename is None:
+        output_filename = f"scene_{selected_scene}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+    
+    cache_key = _cache_key(model, size, quality, selected_scene, scene_script, scene_keyword)
+    if cache and _cache_lookup(cache_key, output_filename):
+        return output_filename
+    
+    image_prompt = build_prompt_for_model(model, all_scenes, selected_scene, scene_script, scene_keyword)
+    image_url = _request_generation(image_prompt, model, size, quality)
+    _download_and_save(image_url, output_filename)
+    _cache_store(cache_key, image_prompt, output_filename)
+    return output_filename
+
+@_retry_transient
+def _request_generation(image_prompt: str, model: str, size: str, quality: str) -> str:
+    response = _get_client().images.generate(
         model=model,
         prompt=image_prompt,
-        size="1024x1024",
-        quality="standard",
+        size=size,
+        quality=quality,
         n=1,
     )
-    
-    image_url = response.data[0].url
-    image_response = requests.get(image_url)
-    
-    if image_response.status_code == 200:
+    return response.data[0].url
+
+@_retry_transient
+def _download_and_save(image_url: str, output_filename: str) -> str:
+    # 전체 PNG를 메모리에 올리지 않고 64KB 단위로 바로 디스크에 기록
+    with _session.get(image_url, stream=True, timeout=(5, 60)) as image_response:
+        image_response.raise_for_status()
+        image_response.raw.decode_content = True
         with open(output_filename, "wb") as f:
-            f.write(image_response.content)
-        return output_filename
+            shutil.copyfileobj(image_response.raw, f, length=1 << 16)
+    save_thumbnail(output_filename)
+    return output_filename
 
 def load_scenes_from_json(json_file_path: str) -> dict:
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open(json_file_path, 'rb') as f:
+        return orjson.loads(f.read())
 
 def create_all_scenes_context(scenes_data: dict) -> str:
     context = "COMPLETE STORY CONTEXT (All 18 Scenes):\n"
@@ -73,9 +224,23 @@ def create_all_scenes_context(scenes_data: dict) -> str:
         context += f"Scene {scene_num}: {scene_data['script']} (키워드: {scene_data['main_keyword']})\n"
     return context
 
-def generate_scene_image(json_file_path: str, scene_number: int, output_dir: str = "images") -> str:
+def generate_scene_image(json_file_path: str, scene_number: int, output_dir: str = "images", all_scenes_context: Optional[str] = None, cache: bool = True, backend: str = "dalle3", low_vram: bool = False, model: str = "dall-e-3", quality: str = "standard", size: str = "1024x1024", output_filename: Optional[str] = None) -> str:
     scenes_data = load_scenes_from_json(json_file_path)
-    
+    return generate_scene_image_from_dict(
+        scenes_data,
+        scene_number,
+        output_dir,
+        all_scenes_context=all_scenes_context,
+        cache=cache,
+        backend=backend,
+        low_vram=low_vram,
+        model=model,
+        quality=quality,
+        size=size,
+        output_filename=output_filename
+    )
+
+def generate_scene_image_from_dict(scenes_data: dict, scene_number: int, output_dir: str = "images", all_scenes_context: Optional[str] = None, cache: bool = True, backend: str = "dalle3", low_vram: bool = False, model: str = "dall-e-3", quality: str = "standard", size: str = "1024x1024", output_filename: Optional[str] = None) -> str:
     if scene_number < 1 or scene_number > 18:
         raise ValueError("Scene number must be between 1 and 18")
     
@@ -87,70 +252,385 @@ def generate_scene_image(json_file_path: str, scene_number: int, output_dir: str
     scene_script = scene_data['script']
     scene_keyword = scene_data['main_keyword']
     
-    all_scenes_context = create_all_scenes_context(scenes_data)
-    output_filename = os.path.join(output_dir, f"scene_{scene_number}.png")
+    if backend == "sdxl-local":
+        output_filenames = [output_filename] if output_filename else None
+        paths = generate_images_local([build_local_image_prompt(scene_script, scene_keyword)], output_dir, scene_numbers=[scene_number], low_vram=low_vram, output_filenames=output_filenames)
+        return str(paths[0])
+    
+    if all_scenes_context is None:
+        all_scenes_context = create_all_scenes_context(scenes_data)
+    if output_filename is None:
+        output_filename = os.path.join(output_dir, f"scene_{scene_number}.png")
     
     image_path = generate_image(
         all_scenes=all_scenes_context,
         selected_scene=scene_number,
         scene_script=scene_script,
         scene_keyword=scene_keyword,
-        output_filename=output_filename
+        output_filename=output_filename,
+        model=model,
+        cache=cache,
+        quality=quality,
+        size=size
     )
     
     return image_path
 
-def generate_all_scenes_with_rate_limit(json_file_path: str, output_dir: str = "images") -> dict:
+def _get_local_pipeline(model_id: str, low_vram: bool = False):
+    pipeline_key = (model_id, low_vram)
+    if pipeline_key not in _local_pipelines:
+        import torch
+        from diffusers import DiffusionPipeline
+        
+        # Ampere(SM80) 이상은 bfloat16, 그 외 GPU는 float16
+        dtype = torch.bfloat16 if torch.cuda.get_device_capability() >= (8, 0) else torch.float16
+        pipeline = DiffusionPipeline.from_pretrained(model_id, torch_dtype=dtype).to("cuda")
+        
+        try:
+            pipeline.enable_xformers_memory_efficient_attention()
+        except (ImportError, ValueError) as e:
+            print(f"⚠️  xFormers unavailable, using default attention: {e}")
+        pipeline.vae.enable_tiling()
+        
+        if low_vram:
+            # UNet 가중치를 int8로 양자화 (VRAM 약 절반)
+            from optimum.quanto import freeze, qint8, quantize
+            
+            quantize(pipeline.unet, weights=qint8)
+            freeze(pipeline.unet)
+        else:
+            pipeline.unet = torch.compile(pipeline.unet, mode="reduce-overhead", fullgraph=True)
+        
+        _local_pipelines[pipeline_key] = pipeline
+    return _local_pipelines[pipeline_key]
+
+def generate_images_local(prompts: List[str], output_dir: str = "images", model_id: str = SDXL_MODEL_ID, scene_numbers: Optional[List[int]] = None, num_inference_steps: int = 30, chunk_size: int = 4, low_vram: bool = False, output_filenames: Optional[List[str]] = None) -> List[Path]:
+    import torch
+    
     os.makedirs(output_dir, exist_ok=True)
+    if scene_numbers is None:
+        scene_numbers = list(range(1, len(prompts) + 1))
     
-    results = {}
-    scenes_data = load_scenes_from_json(json_file_path)
-    all_scenes_context = create_all_scenes_context(scenes_data)
+    pipeline = _get_local_pipeline(model_id, low_vram)
     
-    print(f"⏱️  Processing with rate limit: 5 images per minute (12 second intervals)")
+    try:
+        # 프롬프트 리스트를 한 번에 넘겨 단일 배치로 생성
+        images = pipeline(prompt=prompts, num_inference_steps=num_inference_steps).images
+    except torch.cuda.OutOfMemoryError:
+        print(f"⚠️  Out of GPU memory, retrying in chunks of {chunk_size}")
+        torch.cuda.empty_cache()
+        images = []
+        for start in range(0, len(prompts), chunk_size):
+            images.extend(pipeline(prompt=prompts[start:start + chunk_size], num_inference_steps=num_inference_steps).images)
     
-    for scene_num in range(1, 19):
+    if output_filenames is None:
+        output_filenames = [Path(output_dir) / f"scene_{scene_num}.png" for scene_num in scene_numbers]
+    
+    paths = []
+    for output_filename, image in zip(output_filenames, images):
+        path = Path(output_filename)
+        image.save(path)
+        save_thumbnail(path)
+        paths.append(path)
+    
+    return paths
+
+def _generate_all_scenes_local(scenes_data: dict, output_dir: str, low_vram: bool) -> dict:
+    scene_numbers = list(range(1, 19))
+    prompts = [
+        build_local_image_prompt(scenes_data['scenes'][f"scene_{n}"]['script'], scenes_data['scenes'][f"scene_{n}"]['main_keyword'])
+        for n in scene_numbers
+    ]
+    paths = generate_images_local(prompts, output_dir, scene_numbers=scene_numbers, low_vram=low_vram)
+    return {scene_num: str(path) for scene_num, path in zip(scene_numbers, paths)}
+
+_RESET_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_RESET_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def _parse_reset_duration(value: str) -> float:
+    # "1s", "6m0s", "120ms" 형식의 x-ratelimit-reset-* 헤더 값을 초 단위로 변환
+    return sum(float(amount) * _RESET_UNIT_SECONDS[unit] for amount, unit in _RESET_DURATION_RE.findall(value))
+
+class HeaderRateLimiter:
+    """OpenAI x-ratelimit-* 응답 헤더로 남은 요청 수를 추적해 한도가 찼을 때만 대기하는 rate limiter"""
+    
+    def __init__(self, requests_per_minute: int):
+        # 첫 응답 헤더를 받기 전에는 지정한 분당 요청 수를 가정
+        self.limit = requests_per_minute
+        self.remaining = requests_per_minute
+        self.reset_at = time.time() + 60
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            if self.remaining <= 0:
+                wait = max(0.0, self.reset_at - time.time())
+                if wait > 0:
+                    print(f"⏳ Rate limit reached, waiting {wait:.1f} seconds...")
+                    await asyncio.sleep(wait)
+                self.remaining = self.limit
+                self.reset_at = time.time() + 60
+            self.remaining -= 1
+    
+    def update(self, headers):
+        limit = headers.get("x-ratelimit-limit-requests")
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        reset = headers.get("x-ratelimit-reset-requests")
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset is not None:
+            self.reset_at = time.time() + _parse_reset_duration(reset)
+    
+    def back_off(self, retry_after: float):
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.time() + retry_after)
+
+@_retry_server_errors
+async def _generate_with_headers(openai_async: AsyncOpenAI, image_prompt: str, model: str, size: str, quality: str) -> Tuple[str, dict]:
+    raw_response = await openai_async.images.with_raw_response.generate(
+        model=model,
+        prompt=image_prompt,
+        size=size,
+        quality=quality,
+        n=1,
+    )
+    return raw_response.parse().data[0].url, raw_response.headers
+
+@_retry_server_errors
+async def _download_and_save_async(http_client: httpx.AsyncClient, image_url: str, output_filename: str) -> str:
+    async with http_client.stream("GET", image_url) as image_response:
+        image_response.raise_for_status()
+        # 파일 I/O는 스레드에서 수행해 다른 씬의 요청을 막지 않음
+        f = await asyncio.to_thread(open, output_filename, "wb")
         try:
-            print(f"🎨 Processing Scene {scene_num}/18...")
-            
-            scene_key = f"scene_{scene_num}"
-            scene_data = scenes_data['scenes'][scene_key]
-            scene_script = scene_data['script']
-            scene_keyword = scene_data['main_keyword']
-            
-            output_filename = os.path.join(output_dir, f"scene_{scene_num}.png")
-            
-            image_path = generate_image(
-                all_scenes=all_scenes_context,
-                selected_scene=scene_num,
-                scene_script=scene_script,
-                scene_keyword=scene_keyword,
-                output_filename=output_filename
-            )
-            
-            results[scene_num] = image_path
-            print(f"✅ Scene {scene_num} completed: {image_path}")
-            
-            if scene_num < 18:
-                print(f"⏳ Waiting 12 seconds to respect rate limit...")
-                time.sleep(12)
+            async for chunk in image_response.aiter_bytes(1 << 16):
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+    await asyncio.to_thread(save_thumbnail, output_filename)
+    return output_filename
+
+async def _generate_scene_async(openai_async: AsyncOpenAI, http_client: httpx.AsyncClient, sem: asyncio.Semaphore, limiter: HeaderRateLimiter, scenes_data: dict, all_scenes_context: str, scene_num: int, output_dir: str, model: str, cache: bool, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+    scene_data = scenes_data['scenes'][f"scene_{scene_num}"]
+    output_filename = os.path.join(output_dir, f"scene_{scene_num}.png")
+    
+    # 캐시 적중 시 rate limit을 소모하지 않음
+    cache_key = _cache_key(model, "1024x1024", "standard", scene_num, scene_data['script'], scene_data['main_keyword'])
+    if cache and await asyncio.to_thread(_cache_lookup, cache_key, output_filename):
+        print(f"♻️  Scene {scene_num} loaded from cache: {output_filename}")
+        return output_filename
+    
+    image_prompt = build_prompt_for_model(model, all_scenes_context, scene_num, scene_data['script'], scene_data['main_keyword'])
+    
+    async with sem:
+        # 취소 요청 시 아직 시작하지 않은 씬은 건너뜀
+        if cancel_event is not None and cancel_event.is_set():
+            print(f"⏹️  Scene {scene_num} cancelled")
+            return None
+        
+        print(f"🎨 Processing Scene {scene_num}/18...")
+        
+        try:
+            for attempt in range(3):
+                await limiter.acquire()
+                try:
+                    image_url, headers = await _generate_with_headers(openai_async, image_prompt, model, "1024x1024", "standard")
+                    limiter.update(headers)
+                    break
+                except RateLimitError as e:
+                    # 429 응답의 Retry-After 만큼 모든 요청을 멈춘 뒤 재시도
+                    retry_after = float(e.response.headers.get("retry-after", 60))
+                    limiter.back_off(retry_after)
+                    if attempt == 2:
+                        raise
             
+            await _download_and_save_async(http_client, image_url, output_filename)
+            await asyncio.to_thread(_cache_store, cache_key, image_prompt, output_filename)
         except Exception as e:
             print(f"❌ Scene {scene_num} failed: {e}")
-            results[scene_num] = None
+            return None
+    
+    print(f"✅ Scene {scene_num} completed: {output_filename}")
+    return output_filename
+
+async def _generate_all_scenes_async(scenes_data: dict, output_dir: str, max_concurrency: int, images_per_minute: int, model: str, cache: bool, on_scene_done: Optional[Callable[[int, Optional[str]], None]], cancel_event: Optional[threading.Event] = None) -> dict:
+    all_scenes_context = create_all_scenes_context(scenes_data)
+    sem = asyncio.Semaphore(max_concurrency)
+    limiter = HeaderRateLimiter(images_per_minute)
+    
+    # SDK 내부 재시도를 끄고 429는 HeaderRateLimiter가 바로 처리
+    async with AsyncOpenAI(timeout=60.0, max_retries=0) as openai_async, httpx.AsyncClient(timeout=httpx.Timeout(60, connect=5)) as http_client:
+        async def _run(scene_num: int) -> Optional[str]:
+            image_path = await _generate_scene_async(openai_async, http_client, sem, limiter, scenes_data, all_scenes_context, scene_num, output_dir, model, cache, cancel_event)
+            if on_scene_done:
+                on_scene_done(scene_num, image_path)
+            return image_path
+        
+        scene_numbers = range(1, 19)
+        paths = await asyncio.gather(*[_run(scene_num) for scene_num in scene_numbers])
+    
+    return dict(zip(scene_numbers, paths))
+
+def generate_all_scenes_with_rate_limit(json_file_path: str, output_dir: str = "images", max_concurrency: int = 5, images_per_minute: int = 5, model: str = "dall-e-3", cache: bool = True, backend: str = "dalle3", low_vram: bool = False) -> dict:
+    scenes_data = load_scenes_from_json(json_file_path)
+    return generate_all_scenes_from_dict(scenes_data, output_dir, max_concurrency, images_per_minute, model, cache, backend, low_vram)
+
+def generate_all_scenes_from_dict(scenes_data: dict, output_dir: str = "images", max_concurrency: int = 5, images_per_minute: int = 5, model: str = "dall-e-3", cache: bool = True, backend: str = "dalle3", low_vram: bool = False, on_scene_done: Optional[Callable[[int, Optional[str]], None]] = None, cancel_event: Optional[threading.Event] = None) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    
+    if backend == "sdxl-local":
+        print(f"🖥️  Generating all 18 scenes in one batched local pipeline call ({SDXL_MODEL_ID})")
+        return _generate_all_scenes_local(scenes_data, output_dir, low_vram)
+    
+    print(f"⏱️  Processing concurrently: {max_concurrency} in flight, adapting to rate limit headers (initially {images_per_minute} images per minute)")
+    
+    return asyncio.run(_generate_all_scenes_async(scenes_data, output_dir, max_concurrency, images_per_minute, model, cache, on_scene_done, cancel_event))
+
+def generate_all_scenes_batch(json_file_path: str, output_dir: str = "images", model: str = "dall-e-3", poll_interval: int = 30, cache: bool = True) -> dict:
+    scenes_data = load_scenes_from_json(json_file_path)
+    return generate_all_scenes_batch_from_dict(scenes_data, output_dir, model, poll_interval, cache)
+
+def generate_all_scenes_batch_from_dict(scenes_data: dict, output_dir: str = "images", model: str = "dall-e-3", poll_interval: int = 30, cache: bool = True) -> dict:
+    pending, results = submit_scenes_batch_from_dict(scenes_data, output_dir, model, cache)
+    
+    while pending is not None:
+        time.sleep(poll_interval)
+        batch_results = poll_scenes_batch(pending)
+        if batch_results is not None:
+            results.update((scene_num, path) for scene_num, path in batch_results.items() if path)
+            break
     
     return results
 
+def submit_scenes_batch_from_dict(scenes_data: dict, output_dir: str = "images", model: str = "dall-e-3", cache: bool = True) -> Tuple[Optional[dict], dict]:
+    os.makedirs(output_dir, exist_ok=True)
+    
+    all_scenes_context = create_all_scenes_context(scenes_data)
+    
+    results = {scene_num: None for scene_num in range(1, 19)}
+    pending_scenes = {}
+    
+    batch_requests = []
+    for scene_num in range(1, 19):
+        scene_data = scenes_data['scenes'][f"scene_{scene_num}"]
+        output_filename = os.path.join(output_dir, f"scene_{scene_num}.png")
+        
+        cache_key = _cache_key(model, "1024x1024", "standard", scene_num, scene_data['script'], scene_data['main_keyword'])
+        if cache and _cache_lookup(cache_key, output_filename):
+            results[scene_num] = output_filename
+            print(f"♻️  Scene {scene_num} loaded from cache: {output_filename}")
+            continue
+        
+        prompt = build_prompt_for_model(model, all_scenes_context, scene_num, scene_data['script'], scene_data['main_keyword'])
+        pending_scenes[str(scene_num)] = {"cache_key": cache_key, "prompt": prompt}
+        batch_requests.append({
+            "custom_id": f"scene_{scene_num}",
+            "method": "POST",
+            "url": "/v1/images/generations",
+            "body": {
+                "model": model,
+                "prompt": prompt,
+                "size": "1024x1024",
+                "quality": "standard",
+                "n": 1,
+                # 결과 URL은 약 1시간 뒤 만료되므로 이미지 데이터를 결과 파일에 직접 포함
+                "response_format": "b64_json",
+            },
+        })
+    
+    if not batch_requests:
+        return None, results
+    
+    # 업로드용 입력 파일은 이미지 폴더가 아닌 임시 파일에 기록
+    client = _get_client()
+    with tempfile.TemporaryFile(suffix=".jsonl") as f:
+        for batch_request in batch_requests:
+            f.write(orjson.dumps(batch_request, option=orjson.OPT_APPEND_NEWLINE))
+        f.seek(0)
+        batch_file = client.files.create(file=("batch_input.jsonl", f), purpose="batch")
+    
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/images/generations",
+        completion_window="24h",
+    )
+    print(f"📦 Batch submitted: {batch.id}")
+    
+    # 새로고침/세션 종료 후에도 결과를 회수할 수 있도록 배치 정보를 배치 ID별 파일에 기록
+    pending = {"batch_id": batch.id, "output_dir": output_dir, "scenes": pending_scenes}
+    os.makedirs(BATCH_STATE_DIR, exist_ok=True)
+    with open(_batch_state_path(batch.id), 'wb') as f:
+        f.write(orjson.dumps(pending, option=orjson.OPT_INDENT_2))
+    
+    return pending, results
+
+def _batch_state_path(batch_id: str) -> str:
+    return os.path.join(BATCH_STATE_DIR, f"{batch_id}.json")
+
+def load_pending_batch(batch_id: Optional[str]) -> Optional[dict]:
+    # 외부에서 전달된 ID는 경로로 쓰기 전에 형식 검증
+    if not batch_id or not _BATCH_ID_RE.match(batch_id):
+        return None
+    state_path = _batch_state_path(batch_id)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def poll_scenes_batch(pending: dict) -> Optional[dict]:
+    client = _get_client()
+    batch = client.batches.retrieve(pending["batch_id"])
+    print(f"⏳ Batch {batch.id}: {batch.status}")
+    
+    if batch.status not in ("completed", "failed", "expired", "cancelled"):
+        return None
+    
+    if batch.status != "completed" or not batch.output_file_id:
+        _clear_pending_batch(batch.id)
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+    
+    output_dir = pending["output_dir"]
+    results = {int(scene_num): None for scene_num in pending["scenes"]}
+    
+    # 이미지가 b64_json으로 결과 파일에 들어 있으므로 URL 만료와 무관하게 언제든 회수 가능
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        record = orjson.loads(line)
+        response = record.get("response")
+        scene_num = int(record["custom_id"].replace("scene_", ""))
+        if not response or response.get("status_code") != 200:
+            print(f"❌ Scene {scene_num} failed: {record.get('error') or response}")
+            continue
+        
+        output_filename = os.path.join(output_dir, f"scene_{scene_num}.png")
+        with open(output_filename, "wb") as f:
+            f.write(base64.b64decode(response["body"]["data"][0]["b64_json"]))
+        save_thumbnail(output_filename)
+        
+        scene_info = pending["scenes"][str(scene_num)]
+        _cache_store(scene_info["cache_key"], scene_info["prompt"], output_filename)
+        results[scene_num] = output_filename
+        print(f"✅ Scene {scene_num} completed: {output_filename}")
+    
+    # 모든 결과를 저장한 뒤에만 기록 삭제 (중간에 실패하면 다음 조회에서 다시 회수)
+    _clear_pending_batch(batch.id)
+    return results
+
+def _clear_pending_batch(batch_id: str) -> None:
+    state_path = _batch_state_path(batch_id)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
 if __name__ == "__main__":
 
     json_file = "result4.json"
     output_folder = "test_2"
 
     
-    print(f"🚀 Generating all 18 scenes sequentially...")
+    print(f"🚀 Generating all 18 scenes concurrently...")
     print(f"📁 Input: {json_file}")
     print(f"📁 Output: {output_folder}/")
-    print(f"⏱️  Estimated time: ~3.6 minutes (12 sec intervals)")
     
     start_time = time.time()
     results = generate_all_scenes_with_rate_limit(json_file, output_folder)
@@ -1,13 +1,29 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from typing import Dict
+from functools import lru_cache
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
+from langchain_core.exceptions import OutputParserException
 import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# 이보다 긴 입력은 처음부터 상위 모델로 보냄
+LONG_PROMPT_CHARS = 1000
+
+# flex 처리 등급을 지원하는 모델 (그 외 모델에 보내면 BadRequest)
+FLEX_TIER_MODEL_PREFIXES = ("o3", "o4-mini", "gpt-5")
+
+# temperature 파라미터를 받지 않는 추론 모델
+REASONING_MODEL_PREFIXES = ("o1", "o3", "o4", "gpt-5")
+
+# flex 요청은 대기 시간이 길 수 있으므로 넉넉한 타임아웃 사용 (초)
+FLEX_TIMEOUT = 900
+
+# 오프라인 일괄 생성용 모델 (flex 지원)
+OFFLINE_MODEL = "o4-mini"
+
 
 class Scene(BaseModel):
     script: str = Field(description="Scene dialogue/script text")
@@ -29,11 +45,7 @@ class Result(BaseModel):
         
         return v
 
-def agent(user_prompt, model="gpt-4o-mini"):
-    llm = ChatOpenAI(model=model, temperature=0)
-    parser = PydanticOutputParser(pydantic_object=Result)
-    
-    system_prompt = """광고 웹툰용 18개 씬 생성 전문가입니다.
+SYSTEM_PROMPT = """광고 웹툰용 18개 씬 생성 전문가입니다.
 
     Script 규칙:
     - 간결하고 핵심적인 대사만 작성 (한 문장 또는 짧은 구문)
@@ -47,21 +59,46 @@ def agent(user_prompt, model="gpt-4o-mini"):
     
     Main_keyword: 띄어쓰기 없는 복합어 (예: "날파리떠다니는시야", "친구추천충격")
 
-    {format_instructions}
-
     사용자 입력: {input}"""
+
+# 모델별 체인을 한 번만 구성해 Streamlit rerun 간에 재사용
+@lru_cache(maxsize=4)
+def _build_chain(model, service_tier=None):
+    # 스키마를 프롬프트에 넣지 않고 OpenAI structured outputs(json_schema)로 강제
+    # 지원하지 않는 모델에는 flex 등급을 붙이지 않음
+    if service_tier == "flex" and not model.startswith(FLEX_TIER_MODEL_PREFIXES):
+        print(f"⚠️  {model} does not support the flex service tier, using the default tier")
+        service_tier = None
+    llm_kwargs = {}
+    if service_tier:
+        llm_kwargs["service_tier"] = service_tier
+    if service_tier == "flex":
+        llm_kwargs["timeout"] = FLEX_TIMEOUT
+    # 추론 모델은 temperature를 지정하면 요청이 거부됨
+    if not model.startswith(REASONING_MODEL_PREFIXES):
+        llm_kwargs["temperature"] = 0
+    llm = ChatOpenAI(model=model, **llm_kwargs).with_structured_output(Result, method="json_schema")
     
     prompt = PromptTemplate(
-        template=system_prompt,
-        input_variables=["format_instructions", "input"]
+        template=SYSTEM_PROMPT,
+        input_variables=["input"]
     )
     
-    chain = prompt | llm | parser
-    result = chain.invoke({
-        "format_instructions": parser.get_format_instructions(),
-        "input": user_prompt
-    })
-    return result
+    return prompt | llm
+
+def agent(user_prompt, model="gpt-4o-mini", service_tier=None):
+    return _build_chain(model, service_tier).invoke({"input": user_prompt})
+
+def agent_with_fallback(user_prompt, primary="gpt-4o-mini", fallback="gpt-4o", service_tier=None):
+    # 짧은 입력은 저렴한 모델로 먼저 시도하고, 18개 씬 검증에 실패할 때만 상위 모델 사용
+    if len(user_prompt) >= LONG_PROMPT_CHARS:
+        return agent(user_prompt, fallback, service_tier)
+    
+    try:
+        return agent(user_prompt, primary, service_tier)
+    except (ValidationError, OutputParserException) as e:
+        print(f"⚠️  {primary} failed scene validation, retrying with {fallback}: {e}")
+        return agent(user_prompt, fallback, service_tier)
 
 if __name__ == "__main__":
     user_prompt = """
@@ -74,7 +111,8 @@ if __name__ == "__main__":
     효과 없으면 100% 환불에 지금 34% 할인까지 한다니까 비문증 때문에 고생하고 계시다면 할인할 때 싸게 사세요
     
     """
-    result = agent(user_prompt)
+    # 오프라인 일괄 생성이므로 flex를 지원하는 모델로 저렴한 flex 처리 등급 사용
+    result = agent(user_prompt, model=OFFLINE_MODEL, service_tier="flex")
     
     with open("result4.json", "w", encoding="utf-8") as f:
         json.dump(result.model_dump(), f, ensure_ascii=False, indent=4)
@@ -1,13 +1,17 @@
 import streamlit as st
-import json
+import orjson
+import io
 import os
+import zipfile
 from datetime import datetime
 from pathlib import Path
+import queue
+import threading
 import time
 
 # Local imports
-from sceneCreator import agent as create_scenes
-from imgCreator import generate_scene_image, load_scenes_from_json
+from sceneCreator import agent as create_scenes, agent_with_fallback
+from imgCreator import IMAGE_BACKENDS, PREVIEW_IMAGE_SETTINGS, thumbnail_path, create_all_scenes_context, generate_scene_image_from_dict, generate_all_scenes_from_dict, submit_scenes_batch_from_dict, load_pending_batch, poll_scenes_batch
 
 # Page configuration
 st.set_page_config(
@@ -17,6 +21,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 품질 옵션별 씬 생성 방식 (Balanced: 4o-mini로 시도 후 검증 실패 시 4o)
+SCENE_QUALITY_MODES = {
+    "Fast": lambda prompt: create_scenes(prompt, model="gpt-4o-mini"),
+    "Balanced": lambda prompt: agent_with_fallback(prompt, primary="gpt-4o-mini", fallback="gpt-4o"),
+    "Best": lambda prompt: create_scenes(prompt, model="gpt-4o"),
+}
+
+# 배치 작업 상태를 다시 조회하기까지의 최소 간격 (초)
+BATCH_POLL_INTERVAL = 30
+
 def initialize_session_state():
     """Session state 초기화"""
     if 'scenes_data' not in st.session_state:
@@ -27,6 +41,105 @@ def initialize_session_state():
         st.session_state.generated_images = {}
     if 'scene_creation_complete' not in st.session_state:
         st.session_state.scene_creation_complete = False
+    if 'job_queue' not in st.session_state:
+        st.session_state.job_queue = queue.Queue()
+    if 'job_thread' not in st.session_state:
+        st.session_state.job_thread = None
+    if 'job_cancel' not in st.session_state:
+        st.session_state.job_cancel = threading.Event()
+    if 'job_progress' not in st.session_state:
+        st.session_state.job_progress = None
+    if 'pending_batch' not in st.session_state:
+        # 이 사용자가 새로고침 전에 제출한 배치만 URL의 배치 ID로 복원해 이어서 회수
+        st.session_state.pending_batch = load_pending_batch(st.query_params.get("batch"))
+    if 'batch_checked_at' not in st.session_state:
+        st.session_state.batch_checked_at = 0.0
+
+@st.cache_data(show_spinner=False)
+def _context_for(scenes_data):
+    """씬 데이터가 바뀌지 않으면 rerun 간에 전체 스토리 컨텍스트 재사용"""
+    return create_all_scenes_context(scenes_data)
+
+@st.cache_data(show_spinner=False)
+def _json_bytes_for(scenes_data):
+    """씬 데이터가 바뀌지 않으면 rerun 간에 다운로드용 JSON 재사용"""
+    return orjson.dumps(scenes_data, option=orjson.OPT_INDENT_2)
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _load_image_bytes(path, mtime):
+    """이미지 바이트를 프로세스 메모리에 캐시 (mtime이 바뀌면 다시 읽음, 오래된 항목은 제거)"""
+    with open(path, "rb") as f:
+        return f.read()
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _build_zip(file_specs):
+    """(경로, 압축 내 이름, mtime) 목록이 같으면 다시 압축하지 않음 (PNG는 이미 압축되어 있어 ZIP_STORED 사용)"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for path, arcname, _mtime in file_specs:
+            zf.write(path, arcname=arcname)
+    return buf.getvalue()
+
+def store_generated_image(scene_num, image_path, kind="final"):
+    """생성된 이미지 경로를 씬별 미리보기/최종 슬롯에 저장"""
+    st.session_state.generated_images.setdefault(scene_num, {})[kind] = image_path
+
+def get_display_image_path(scene_images):
+    """최종 이미지가 있으면 최종, 없으면 미리보기 경로 반환"""
+    return scene_images.get("final") or scene_images.get("preview")
+
+def _bulk_image_worker(scenes_data, job_queue, cancel_event, model, cache):
+    """백그라운드 스레드에서 전체 씬 이미지를 생성하고 진행 상황을 큐로 전달 (st.* 호출 금지)"""
+    def on_scene_done(scene_num, image_path):
+        if image_path:
+            job_queue.put_nowait((scene_num, "done", image_path))
+        else:
+            job_queue.put_nowait((scene_num, "cancelled" if cancel_event.is_set() else "failed", None))
+    
+    try:
+        generate_all_scenes_from_dict(
+            scenes_data,
+            "generated_images",
+            model=model,
+            cache=cache,
+            on_scene_done=on_scene_done,
+            cancel_event=cancel_event
+        )
+        job_queue.put_nowait((None, "cancelled" if cancel_event.is_set() else "finished", None))
+    except Exception as e:
+        job_queue.put_nowait((None, "error", str(e)))
+
+def start_bulk_image_job(model, cache):
+    """전체 이미지 생성 작업을 백그라운드 스레드로 시작"""
+    st.session_state.job_queue = queue.Queue()
+    st.session_state.job_cancel = threading.Event()
+    st.session_state.job_progress = {"completed": 0, "failed": [], "status": "running", "error": None}
+    st.session_state.job_thread = threading.Thread(
+        target=_bulk_image_worker,
+        args=(st.session_state.scenes_data, st.session_state.job_queue, st.session_state.job_cancel, model, cache),
+        daemon=True
+    )
+    st.session_state.job_thread.start()
+
+def is_job_running():
+    """백그라운드 이미지 생성 작업 진행 여부"""
+    return st.session_state.job_thread is not None and st.session_state.job_thread.is_alive()
+
+def drain_job_queue():
+    """백그라운드 작업이 큐에 넣은 진행 상황을 세션 상태에 반영"""
+    progress = st.session_state.job_progress
+    while not st.session_state.job_queue.empty():
+        scene_num, status, image_path = st.session_state.job_queue.get_nowait()
+        if scene_num is None:
+            progress["status"] = status
+            progress["error"] = None if status != "error" else image_path
+            continue
+        
+        progress["completed"] += 1
+        if status == "done":
+            store_generated_image(scene_num, image_path)
+        elif status == "failed":
+            progress["failed"].append(scene_num)
 
 def display_scene_data(scenes_data):
     """씬 데이터를 표시하는 함수"""
@@ -56,14 +169,54 @@ def save_scenes_to_json(scenes_data, filename=None):
     
     filepath = os.path.join(os.getcwd(), filename)
     
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(scenes_data, f, ensure_ascii=False, indent=4)
+    with open(filepath, "wb") as f:
+        f.write(orjson.dumps(scenes_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     
     return filepath
 
+def set_pending_batch(pending):
+    """진행 중인 배치를 세션과 URL에 기록 (새로고침해도 같은 사용자만 이어서 회수)"""
+    st.session_state.pending_batch = pending
+    if pending:
+        st.query_params["batch"] = pending["batch_id"]
+    elif "batch" in st.query_params:
+        del st.query_params["batch"]
+
+def check_pending_batch(force=False):
+    """제출된 배치 작업 상태를 조회하고, 완료되었으면 이미지를 세션 상태에 반영"""
+    pending = st.session_state.pending_batch
+    if not pending:
+        return
+    if not force and time.time() - st.session_state.batch_checked_at < BATCH_POLL_INTERVAL:
+        return
+    st.session_state.batch_checked_at = time.time()
+    
+    try:
+        results = poll_scenes_batch(pending)
+    except RuntimeError as e:
+        # 실패/만료/취소로 끝난 배치
+        set_pending_batch(None)
+        st.error(f"❌ 배치 이미지 생성 중 오류가 발생했습니다: {str(e)}")
+        return
+    except Exception as e:
+        # 조회 중 일시적인 오류는 배치 정보를 유지하고 다음 조회에서 재시도
+        st.warning(f"⚠️ 배치 상태 조회 중 오류가 발생했습니다: {str(e)}")
+        return
+    
+    if results is None:
+        return
+    
+    set_pending_batch(None)
+    for scene_num, image_path in results.items():
+        if image_path:
+            store_generated_image(scene_num, image_path)
+    successful = sum(1 for r in results.values() if r is not None)
+    st.success(f"🎉 배치 작업 완료: {successful}/{len(results)}개 씬 이미지가 생성되었습니다!")
+
 def main():
     """메인 애플리케이션"""
     initialize_session_state()
+    drain_job_queue()
     
     st.title("🎨 광고 웹툰 컨텐츠 생성기")
     st.markdown("---")
@@ -72,6 +225,9 @@ def main():
     with st.sidebar:
         st.header("📊 진행 상황")
         
+        # 제출된 배치 작업이 있으면 주기적으로 완료 여부 확인
+        check_pending_batch()
+        
         # 씬 생성 상태
         if st.session_state.scenes_data:
             st.success("✅ 씬 생성 완료")
@@ -84,6 +240,12 @@ def main():
             st.success(f"🖼️ 이미지 생성: {total_images}/18")
         else:
             st.info("🖼️ 이미지 생성 대기 중")
+        
+        st.header("⚙️ 설정")
+        low_vram = st.checkbox(
+            "저 VRAM 모드",
+            help="sdxl-local 백엔드에서 UNet을 int8로 양자화해 VRAM 사용량을 줄입니다."
+        )
     
     # 섹션 1: 입력 섹션 (프롬프트 입력)
     with st.container():
@@ -111,13 +273,18 @@ def main():
             placeholder="제품이나 서비스에 대한 자연스러운 체험담을 입력해주세요..."
         )
         
-        # 모델 선택
+        # 품질 선택
         col1, col2 = st.columns([3, 1])
         with col2:
-            selected_model = st.selectbox(
-                "모델 선택:",
-                ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"],
-                index=0
+            scene_quality = st.radio(
+                "품질:",
+                list(SCENE_QUALITY_MODES),
+                index=1,
+                help="Fast: gpt-4o-mini / Balanced: gpt-4o-mini, 검증 실패 시 gpt-4o / Best: gpt-4o"
+            )
+            auto_generate_images = st.checkbox(
+                "씬 생성 후 이미지 자동 생성",
+                help="씬 생성이 끝나는 즉시 백그라운드에서 18개 씬 이미지 생성을 시작합니다. (3. 이미지 생성 섹션의 모델/강제 재생성 설정 사용, dalle3 백엔드 전용)"
             )
         
         # 씬 생성 버튼
@@ -126,17 +293,33 @@ def main():
                 with st.spinner("씬을 생성하는 중입니다... 잠시만 기다려주세요."):
                     try:
                         # 씬 생성
-                        result = create_scenes(user_prompt, model=selected_model)
+                        result = SCENE_QUALITY_MODES[scene_quality](user_prompt)
                         
                         # 결과를 딕셔너리로 변환
                         st.session_state.scenes_data = result.model_dump()
                         st.session_state.scene_creation_complete = True
                         
+                        # 버튼 클릭을 기다리지 않고 바로 이미지 생성 시작 (3번 섹션의 모델/재생성 설정 사용)
+                        auto_started = (
+                            auto_generate_images
+                            and st.session_state.get("image_backend", IMAGE_BACKENDS[0]) == "dalle3"
+                            and not is_job_running()
+                        )
+                        if auto_started:
+                            start_bulk_image_job(
+                                st.session_state.get("image_model", "dall-e-3"),
+                                cache=not st.session_state.get("force_regenerate", False)
+                            )
+                        
                         # JSON 파일로 저장
                         saved_file = save_scenes_to_json(st.session_state.scenes_data)
                         
                         st.success(f"✅ 18개 씬이 성공적으로 생성되었습니다!")
                         st.success(f"📁 파일 저장됨: {saved_file}")
+                        if auto_started:
+                            st.info("🖼️ 이미지 생성이 백그라운드에서 시작되었습니다. 3. 이미지 생성 섹션에서 진행 상황을 확인하세요.")
+                        elif auto_generate_images:
+                            st.info("🖼️ 자동 이미지 생성은 dalle3 백엔드에서만 지원됩니다. 3. 이미지 생성 섹션에서 직접 생성하세요.")
                         
                     except Exception as e:
                         st.error(f"❌ 씬 생성 중 오류가 발생했습니다: {str(e)}")
@@ -153,10 +336,9 @@ def main():
             display_scene_data(st.session_state.scenes_data)
             
             # JSON 다운로드 버튼
-            json_str = json.dumps(st.session_state.scenes_data, ensure_ascii=False, indent=4)
             st.download_button(
                 label="📥 씬 데이터 JSON 다운로드",
-                data=json_str,
+                data=_json_bytes_for(st.session_state.scenes_data),
                 file_name=f"scenes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
@@ -184,18 +366,47 @@ def main():
                 image_model = st.selectbox(
                     "이미지 모델:",
                     ["dall-e-3", "dall-e-2"],
-                    index=0
+                    index=0,
+                    key="image_model"
+                )
+                
+                # 이미지 생성 백엔드 선택 (sdxl-local은 GPU 필요)
+                image_backend = st.selectbox(
+                    "이미지 백엔드:",
+                    IMAGE_BACKENDS,
+                    index=0,
+                    key="image_backend",
+                    help="sdxl-local: 로컬 GPU에서 Stable Diffusion XL로 18개 씬을 한 번에 생성합니다."
+                )
+                
+                # 캐시 무시 옵션
+                force_regenerate = st.checkbox(
+                    "강제 재생성",
+                    key="force_regenerate",
+                    help="같은 대사/키워드로 생성된 이미지가 캐시에 있어도 새로 생성합니다."
                 )
             
             with col3:
                 st.write("")  # 공간 조정
                 st.write("")  # 공간 조정
                 
-                # 단일 씬 이미지 생성
-                if st.button("🎨 이미지 생성", type="primary"):
-                    # 임시 JSON 파일 생성
-                    temp_json_file = "temp_scenes.json"
-                    save_scenes_to_json(st.session_state.scenes_data, temp_json_file)
+                # 단일 씬 이미지 생성 (미리보기: 저해상도 빠른 생성 / 최종: 선택한 모델)
+                # sdxl-local은 미리보기 설정(dall-e-2 저해상도)이 적용되지 않으므로 비활성화
+                preview_clicked = st.button(
+                    "🔍 미리보기 (빠름)",
+                    disabled=image_backend == "sdxl-local",
+                    help="미리보기는 dalle3 백엔드에서만 사용할 수 있습니다." if image_backend == "sdxl-local" else None
+                )
+                final_clicked = st.button("🎨 최종 HD", type="primary")
+                
+                if preview_clicked or final_clicked:
+                    render_kind = "preview" if preview_clicked else "final"
+                    if preview_clicked:
+                        render_settings = PREVIEW_IMAGE_SETTINGS
+                        output_filename = os.path.join("generated_images", f"scene_{selected_scene_num}_preview.png")
+                    else:
+                        render_settings = {"model": image_model, "size": "1024x1024", "quality": "standard"}
+                        output_filename = os.path.join("generated_images", f"scene_{selected_scene_num}.png")
                     
                     with st.spinner(f"씬 {selected_scene_num} 이미지를 생성하는 중..."):
                         try:
@@ -203,87 +414,110 @@ def main():
                             os.makedirs("generated_images", exist_ok=True)
                             
                             # 이미지 생성
-                            image_path = generate_scene_image(
-                                temp_json_file, 
-                                selected_scene_num, 
-                                "generated_images"
+                            image_path = generate_scene_image_from_dict(
+                                st.session_state.scenes_data,
+                                selected_scene_num,
+                                "generated_images",
+                                all_scenes_context=_context_for(st.session_state.scenes_data),
+                                cache=not force_regenerate,
+                                backend=image_backend,
+                                low_vram=low_vram,
+                                output_filename=output_filename,
+                                **render_settings
                             )
                             
                             # 세션 상태에 저장
-                            st.session_state.generated_images[selected_scene_num] = image_path
+                            store_generated_image(selected_scene_num, image_path, render_kind)
                             
                             st.success(f"✅ 씬 {selected_scene_num} 이미지가 생성되었습니다!")
-                            
-                            # 임시 파일 정리
-                            if os.path.exists(temp_json_file):
-                                os.remove(temp_json_file)
                                 
                         except Exception as e:
                             st.error(f"❌ 이미지 생성 중 오류가 발생했습니다: {str(e)}")
-                            
-                            # 임시 파일 정리
-                            if os.path.exists(temp_json_file):
-                                os.remove(temp_json_file)
             
             # 전체 이미지 생성 버튼
             st.markdown("---")
             col1, col2 = st.columns([1, 1])
             
             with col1:
-                if st.button("🎨 전체 18개 씬 이미지 생성 (연속)", type="secondary", use_container_width=True):
-                    # 임시 JSON 파일 생성
-                    temp_json_file = "temp_scenes_all.json"
-                    save_scenes_to_json(st.session_state.scenes_data, temp_json_file)
-                    
-                    # 진행률 표시
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    try:
-                        # 이미지 디렉토리 생성
-                        os.makedirs("generated_images", exist_ok=True)
-                        
-                        for scene_num in range(1, 19):
-                            status_text.text(f"씬 {scene_num}/18 이미지 생성 중...")
+                batch_mode = st.checkbox(
+                    "배치 모드",
+                    help="OpenAI Batch API로 18개 씬을 한 번에 제출합니다. 비용이 50% 절감되지만 완료까지 최대 24시간이 걸릴 수 있습니다."
+                )
+                
+                bulk_clicked = st.button("🎨 전체 18개 씬 이미지 생성 (연속)", type="secondary", use_container_width=True)
+                
+                if bulk_clicked and image_backend == "sdxl-local":
+                    with st.spinner("로컬 GPU에서 18개 씬 이미지를 한 번에 생성하는 중..."):
+                        try:
+                            results = generate_all_scenes_from_dict(st.session_state.scenes_data, "generated_images", backend="sdxl-local", low_vram=low_vram)
                             
+                            # 세션 상태에 저장
+                            for scene_num, image_path in results.items():
+                                store_generated_image(scene_num, image_path)
+                            st.success("🎉 전체 18개 씬의 이미지가 생성되었습니다!")
+                            
+                        except Exception as e:
+                            st.error(f"❌ 로컬 이미지 생성 중 오류가 발생했습니다: {str(e)}")
+                
+                elif bulk_clicked and batch_mode:
+                    if st.session_state.pending_batch:
+                        st.warning("⚠️ 이미 제출된 배치 작업이 진행 중입니다.")
+                    else:
+                        with st.spinner("배치 작업을 제출하는 중..."):
                             try:
-                                image_path = generate_scene_image(
-                                    temp_json_file,
-                                    scene_num,
-                                    "generated_images"
-                                )
+                                # 제출만 하고 바로 반환 (완료 여부는 rerun 때마다 조회)
+                                pending, results = submit_scenes_batch_from_dict(st.session_state.scenes_data, "generated_images", model=image_model, cache=not force_regenerate)
                                 
-                                # 세션 상태에 저장
-                                st.session_state.generated_images[scene_num] = image_path
-                                
-                                # 진행률 업데이트
-                                progress = scene_num / 18
-                                progress_bar.progress(progress)
-                                
-                                # API 제한 대기 (첫 17개 씬에만 적용)
-                                if scene_num < 18:
-                                    time.sleep(12)  # 12초 대기
+                                # 캐시에서 불러온 씬은 바로 세션 상태에 저장
+                                for scene_num, image_path in results.items():
+                                    if image_path:
+                                        store_generated_image(scene_num, image_path)
                                 
+                                set_pending_batch(pending)
+                                st.session_state.batch_checked_at = time.time()
+                                if pending is None:
+                                    st.success("🎉 모든 씬 이미지를 캐시에서 불러왔습니다!")
+                                    
                             except Exception as e:
-                                st.error(f"씬 {scene_num} 이미지 생성 실패: {str(e)}")
-                                continue
-                        
-                        status_text.text("✅ 모든 이미지 생성 완료!")
+                                st.error(f"❌ 배치 작업 제출 중 오류가 발생했습니다: {str(e)}")
+                
+                elif bulk_clicked:
+                    if is_job_running():
+                        st.warning("⚠️ 전체 이미지 생성이 이미 진행 중입니다.")
+                    else:
+                        # rate limit 응답 헤더에 맞춰 대기하며 백그라운드에서 동시 생성
+                        start_bulk_image_job(image_model, not force_regenerate)
+                
+                # 제출된 배치 작업 상태 표시
+                if st.session_state.pending_batch:
+                    if st.button("🔄 배치 상태 확인", use_container_width=True):
+                        check_pending_batch(force=True)
+                if st.session_state.pending_batch:
+                    pending = st.session_state.pending_batch
+                    st.info(f"📦 배치 작업 {pending['batch_id']} 진행 중 ({len(pending['scenes'])}개 씬). 완료되면 자동으로 이미지를 가져옵니다.")
+                
+                # 백그라운드 작업 진행률 표시
+                progress = st.session_state.job_progress
+                if progress:
+                    st.progress(progress["completed"] / 18)
+                    
+                    if is_job_running():
+                        st.text(f"씬 {progress['completed']}/18 이미지 생성 완료...")
+                        if st.button("⏹️ 취소", use_container_width=True):
+                            st.session_state.job_cancel.set()
+                            st.info("진행 중인 씬이 끝나면 작업이 중단됩니다.")
+                    elif progress["status"] == "finished":
                         st.success("🎉 전체 18개 씬의 이미지가 생성되었습니다!")
-                        
-                        # 임시 파일 정리
-                        if os.path.exists(temp_json_file):
-                            os.remove(temp_json_file)
-                            
-                    except Exception as e:
-                        st.error(f"❌ 전체 이미지 생성 중 오류가 발생했습니다: {str(e)}")
-                        
-                        # 임시 파일 정리
-                        if os.path.exists(temp_json_file):
-                            os.remove(temp_json_file)
+                    elif progress["status"] == "cancelled":
+                        st.warning(f"⏹️ 작업이 취소되었습니다. ({progress['completed']}/18)")
+                    elif progress["status"] == "error":
+                        st.error(f"❌ 전체 이미지 생성 중 오류가 발생했습니다: {progress['error']}")
+                    
+                    for scene_num in progress["failed"]:
+                        st.error(f"씬 {scene_num} 이미지 생성 실패")
             
             with col2:
-                st.info("⏱️ 전체 생성 시 약 3-4분 소요됩니다 (API 제한으로 인한 대기시간 포함)")
+                st.info("⏱️ 전체 생성은 계정의 분당 요청 한도 내에서 백그라운드로 동시에 진행됩니다 (진행 중에도 화면 사용 가능)")
         
         else:
             st.info("이미지를 생성하려면 먼저 씬 데이터를 생성해주세요.")
@@ -299,6 +533,9 @@ def main():
             total_generated = len(st.session_state.generated_images)
             st.success(f"총 {total_generated}개의 이미지가 생성되었습니다.")
             
+            # 이미지별 exists() 대신 디렉토리를 한 번만 읽어 존재 여부 확인 (수정 시각은 실제로 표시하는 파일만 조회)
+            existing = {e.name for e in os.scandir("generated_images")} if os.path.isdir("generated_images") else set()
+            
             # 갤러리 표시 옵션
             col1, col2 = st.columns([3, 1])
             with col2:
@@ -318,11 +555,20 @@ def main():
                     for j, col in enumerate(cols):
                         if i + j < len(scene_numbers):
                             scene_num = scene_numbers[i + j]
-                            image_path = st.session_state.generated_images[scene_num]
+                            scene_images = st.session_state.generated_images[scene_num]
+                            image_path = get_display_image_path(scene_images)
+                            caption = f"씬 {scene_num}" if "final" in scene_images else f"씬 {scene_num} (미리보기)"
                             
                             with col:
-                                if os.path.exists(image_path):
-                                    st.image(image_path, caption=f"씬 {scene_num}")
+                                image_name = os.path.basename(image_path)
+                                if image_name in existing:
+                                    # 격자뷰는 썸네일(WebP)을 사용하고, 원본 PNG는 슬라이드뷰/다운로드에만 사용
+                                    thumb_path = thumbnail_path(image_path)
+                                    thumb_name = os.path.basename(thumb_path)
+                                    if thumb_name in existing:
+                                        st.image(_load_image_bytes(thumb_path, os.stat(thumb_path).st_mtime), caption=caption)
+                                    else:
+                                        st.image(_load_image_bytes(image_path, os.stat(image_path).st_mtime), caption=caption)
                                     
                                     # 씬 정보 표시
                                     if st.session_state.scenes_data:
@@ -345,12 +591,13 @@ def main():
                 
                 # 선택된 씬 이미지 표시
                 if selected_scene in st.session_state.generated_images:
-                    image_path = st.session_state.generated_images[selected_scene]
+                    image_path = get_display_image_path(st.session_state.generated_images[selected_scene])
                     
-                    if os.path.exists(image_path):
+                    image_name = os.path.basename(image_path)
+                    if image_name in existing:
                         col1, col2, col3 = st.columns([1, 2, 1])
                         with col2:
-                            st.image(image_path, caption=f"씬 {selected_scene}")
+                            st.image(_load_image_bytes(image_path, os.stat(image_path).st_mtime), caption=f"씬 {selected_scene}")
                         
                         # 씬 정보 표시
                         if st.session_state.scenes_data:
@@ -369,12 +616,29 @@ def main():
             st.markdown("---")
             st.subheader("📥 이미지 다운로드")
             
-            # ZIP 파일로 전체 이미지 다운로드 (간단한 방법으로 구현)
-            if st.button("📦 모든 이미지를 ZIP으로 다운로드"):
-                st.info("💡 생성된 이미지들은 'generated_images' 폴더에서 확인할 수 있습니다.")
+            # ZIP 파일로 전체 이미지 다운로드 (최종 이미지 우선, 없으면 미리보기)
+            file_specs = []
+            for scene_num in sorted(st.session_state.generated_images):
+                image_path = get_display_image_path(st.session_state.generated_images[scene_num])
+                image_name = os.path.basename(image_path)
+                if image_name in existing:
+                    file_specs.append((image_path, f"scene_{scene_num}.png", os.stat(image_path).st_mtime))
+            
+            if file_specs:
+                st.download_button(
+                    label="📦 모든 이미지를 ZIP으로 다운로드",
+                    data=_build_zip(tuple(file_specs)),
+                    file_name="scenes.zip",
+                    mime="application/zip"
+                )
         
         else:
             st.info("아직 생성된 이미지가 없습니다. 먼저 이미지를 생성해주세요.")
+    
+    # 백그라운드 작업이 진행 중이면 주기적으로 rerun하여 큐의 진행 상황을 반영
+    if is_job_running() or not st.session_state.job_queue.empty():
+        time.sleep(0.5)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
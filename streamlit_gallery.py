@@ -1,19 +1,90 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import os
+import re
+import shutil
+import threading
 import zipfile
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
 from PIL import Image
 import datetime
 from typing import List, Dict, Optional
 import base64
 
 
+# 파일명에 사용할 수 없는 문자 (영숫자/한글, 공백, -, _ 이외)
+_SAFE = re.compile(r'[^\w \-]+')
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _build_zip(file_specs: tuple) -> bytes:
+    """(경로, mtime, 크기, 압축 내 파일명) 목록이 같으면 rerun 간에 ZIP 재사용"""
+    buffer = BytesIO()
+    # PNG는 이미 압축되어 있으므로 DEFLATE 없이 저장
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+        for image_path, _mtime, _size, archive_name in file_specs:
+            # 1MB 단위로 복사해 원본 파일 전체를 따로 메모리에 올리지 않음
+            zip_info = zipfile.ZipInfo.from_file(image_path, archive_name)
+            with zip_file.open(zip_info, 'w', force_zip64=True) as dest, open(image_path, "rb") as src:
+                shutil.copyfileobj(src, dest, length=1 << 20)
+    
+    return buffer.getvalue()
+
+
+@st.cache_resource(show_spinner=False, max_entries=24)
+def _read_image_bytes(image_path: str, mtime: float) -> bytes:
+    """다운로드용 이미지 바이트 (rerun마다 복사하지 않고 공유, 최근 두 페이지 분량만 유지)"""
+    with open(image_path, "rb") as f:
+        return f.read()
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _get_thumbnail(image_path: str, mtime: float, max_side: int = 256) -> bytes:
+    """격자 표시용 축소 JPEG (원본은 확대 시에만 사용)"""
+    with Image.open(image_path) as image:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=82, progressive=True)
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _get_thumbnail_b64(image_path: str, mtime: float, max_side: int = 256) -> str:
+    """썸네일을 data URI용 base64 문자열로 변환 (미디어 엔드포인트 요청 없이 페이지에 포함)"""
+    return base64.b64encode(_get_thumbnail(image_path, mtime, max_side)).decode("ascii")
+
+
+def _stat_images(images: List[Dict]):
+    """디렉토리별로 scandir 한 번씩만 호출하여 각 이미지의 stat 결과를 image_info['_stat']에 저장"""
+    entries = {}
+    for directory in {os.path.dirname(image_info.get('path') or '') for image_info in images}:
+        try:
+            with os.scandir(directory or '.') as it:
+                for entry in it:
+                    entries[os.path.join(directory, entry.name)] = entry
+        except OSError:
+            continue
+            
+    for image_info in images:
+        entry = entries.get(image_info.get('path'))
+        image_info['_stat'] = entry.stat() if entry is not None and entry.is_file() else None
+
+
+def _change_gallery_page(delta: int, page_count: int):
+    """갤러리 페이지를 이동하고 [0, page_count - 1] 범위로 제한"""
+    page = st.session_state.get("gallery_page", 0) + delta
+    st.session_state["gallery_page"] = max(0, min(page, page_count - 1))
+
+
 class ImageGallery:
     """이미지 갤러리 표시 및 다운로드 관리 클래스"""
     
     def __init__(self):
         """갤러리 초기화"""
         self.columns_per_row = 3
+        self.page_size = 12
+        self.thumbnail_size = 256
         
     def display_gallery(self, images: List[Dict[str, any]], scene_info: Optional[Dict] = None):
         """
@@ -31,23 +102,78 @@ class ImageGallery:
         if scene_info:
             self._display_scene_info(scene_info)
             
+        # 존재 여부/mtime/크기를 한 번에 조회해 이후 단계에서 재사용
+        _stat_images(images)
+        
+        # ZIP 파일명용 타임스탬프는 렌더링마다 한 번만 계산
+        now_stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            
         # 전체 다운로드 버튼
         if len(images) > 1:
-            self._create_bulk_download(images, scene_info)
+            self._create_bulk_download(images, scene_info, now_stamp)
             
         # 이미지 그리드 표시
         st.markdown("### 📸 생성된 이미지")
         
-        # 3열 그리드 생성
-        for idx in range(0, len(images), self.columns_per_row):
+        # 현재 페이지의 이미지만 위젯으로 생성
+        page = self._display_pagination(len(images))
+        start = page * self.page_size
+        end = min(start + self.page_size, len(images))
+        self._prewarm_thumbnails(images[start:end])
+        
+        # 3열 그리드 생성 (위젯 key는 전체 인덱스 기준)
+        for idx in range(start, end, self.columns_per_row):
             cols = st.columns(self.columns_per_row)
             
             for col_idx in range(self.columns_per_row):
                 img_idx = idx + col_idx
-                if img_idx < len(images):
+                if img_idx < end:
                     with cols[col_idx]:
                         self._display_single_image(images[img_idx], img_idx)
                         
+    def _prewarm_thumbnails(self, images: List[Dict]):
+        """현재 페이지 썸네일을 병렬로 미리 생성해 캐시에 채움 (Pillow는 디코딩 중 GIL 해제)"""
+        images = [image_info for image_info in images if image_info.get('_stat') is not None]
+        if len(images) < 2:
+            return
+            
+        ctx = get_script_run_ctx()
+        
+        def _warm(image_info: Dict):
+            # st.cache_data를 워커 스레드에서 쓰기 위해 현재 세션 컨텍스트 연결
+            add_script_run_ctx(threading.current_thread(), ctx)
+            try:
+                _get_thumbnail_b64(image_info['path'], image_info['_stat'].st_mtime, self.thumbnail_size)
+            except Exception:
+                pass  # 실패한 이미지는 타일 렌더링 시 오류로 표시됨
+                
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+            list(executor.map(_warm, images))
+            
+    def _display_pagination(self, image_count: int) -> int:
+        """이전/다음 버튼으로 갤러리 페이지 이동 후 현재 페이지 번호 반환"""
+        page_count = max(1, (image_count + self.page_size - 1) // self.page_size)
+        # 이미지 수가 줄었을 수 있으므로 렌더링 전에 범위 보정
+        page = max(0, min(st.session_state.get("gallery_page", 0), page_count - 1))
+        st.session_state["gallery_page"] = page
+        
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            
+            # 페이지 변경은 콜백에서 처리해 버튼 상태와 표시 페이지가 같은 rerun에 반영되도록 함
+            with col1:
+                st.button("◀ 이전", key="gallery_prev", disabled=page == 0,
+                          on_click=_change_gallery_page, args=(-1, page_count))
+                    
+            with col3:
+                st.button("다음 ▶", key="gallery_next", disabled=page == page_count - 1,
+                          on_click=_change_gallery_page, args=(1, page_count))
+                    
+            with col2:
+                st.caption(f"페이지 {page + 1} / {page_count}")
+                
+        return page
+        
     def _display_scene_info(self, scene_info: Dict):
         """씬 정보 표시"""
         with st.expander("🎬 씬 정보", expanded=True):
@@ -71,13 +197,11 @@ class ImageGallery:
         try:
             # 이미지 파일 경로
             image_path = image_info.get('path')
-            if not os.path.exists(image_path):
+            image_stat = image_info.get('_stat')
+            if image_stat is None:
                 st.error(f"이미지를 찾을 수 없습니다: {image_path}")
                 return
                 
-            # 이미지 로드 및 표시
-            image = Image.open(image_path)
-            
             # 썸네일 표시 (클릭하면 확대)
             with st.container():
                 # 이미지 정보
@@ -85,39 +209,47 @@ class ImageGallery:
                 
                 # 이미지 표시 (클릭 시 확대)
                 if st.button(f"🔍 확대", key=f"expand_{index}"):
-                    self._show_enlarged_image(image, image_info)
+                    self._show_enlarged_image(image_path, image_info)
                 
-                # 썸네일 표시
-                st.image(image, use_container_width=True)
+                # 썸네일 표시 (원본 대신 축소 JPEG를 data URI로 인라인, 고정 폭으로 레이아웃 재계산 방지)
+                mtime = image_stat.st_mtime
+                thumb_b64 = _get_thumbnail_b64(image_path, mtime, self.thumbnail_size)
+                st.markdown(
+                    f'<img src="data:image/jpeg;base64,{thumb_b64}" width="{self.thumbnail_size}">',
+                    unsafe_allow_html=True
+                )
                 
                 # 다운로드 버튼
                 download_filename = self._generate_filename(image_info, index)
-                with open(image_path, "rb") as file:
-                    st.download_button(
-                        label="⬇️ 다운로드",
-                        data=file.read(),
-                        file_name=download_filename,
-                        mime="image/png",
-                        key=f"download_{index}"
-                    )
+                st.download_button(
+                    label="⬇️ 다운로드",
+                    data=_read_image_bytes(image_path, mtime),
+                    file_name=download_filename,
+                    mime="image/png",
+                    key=f"download_{index}"
+                )
                     
                 # 이미지 정보 표시
                 if st.checkbox("정보 보기", key=f"info_{index}"):
-                    self._display_image_metadata(image_info, image)
+                    self._display_image_metadata(image_info, image_path)
                     
         except Exception as e:
             st.error(f"이미지 표시 오류: {str(e)}")
             
-    def _show_enlarged_image(self, image: Image.Image, image_info: Dict):
+    def _show_enlarged_image(self, image_path: str, image_info: Dict):
         """확대된 이미지를 모달로 표시"""
         # Streamlit의 제한으로 인해 실제 모달 대신 확대된 이미지 표시
-        st.image(image, caption=image_info.get('filename', ''), use_container_width=True)
+        st.image(image_path, caption=image_info.get('filename', ''), use_container_width=True)
         
-    def _display_image_metadata(self, image_info: Dict, image: Image.Image):
+    def _display_image_metadata(self, image_info: Dict, image_path: str):
         """이미지 메타데이터 표시"""
+        # Image.open은 헤더만 읽으므로 픽셀 디코딩 없이 크기 확인
+        with Image.open(image_path) as image:
+            width, height = image.size
+            
         metadata = {
             "파일명": image_info.get('filename', 'N/A'),
-            "크기": f"{image.width} x {image.height}",
+            "크기": f"{width} x {height}",
             "생성 시간": image_info.get('created_at', 'N/A'),
             "프롬프트": image_info.get('prompt', 'N/A')[:100] + "..." if image_info.get('prompt') else 'N/A'
         }
@@ -125,7 +257,7 @@ class ImageGallery:
         for key, value in metadata.items():
             st.text(f"{key}: {value}")
             
-    def _create_bulk_download(self, images: List[Dict], scene_info: Optional[Dict] = None):
+    def _create_bulk_download(self, images: List[Dict], scene_info: Optional[Dict], now_stamp: str):
         """전체 이미지 ZIP 다운로드 생성"""
         st.markdown("### 📦 전체 다운로드")
         
@@ -133,11 +265,10 @@ class ImageGallery:
         
         with col1:
             # ZIP 파일명 생성
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             scene_title = scene_info.get('title', 'images') if scene_info else 'images'
             # 파일명에 사용할 수 없는 문자 제거
-            safe_title = "".join(c for c in scene_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            zip_filename = f"{safe_title}_{timestamp}.zip"
+            safe_title = _SAFE.sub('', scene_title).rstrip()
+            zip_filename = f"{safe_title}_{now_stamp}.zip"
             
         with col2:
             st.metric("총 이미지 수", len(images))
@@ -155,20 +286,17 @@ class ImageGallery:
                 )
                 
     def _create_zip_file(self, images: List[Dict]) -> Optional[bytes]:
-        """이미지들을 ZIP 파일로 압축"""
+        """이미지들을 ZIP 파일로 압축 (파일이 바뀌지 않았으면 캐시된 ZIP 반환)"""
         try:
-            zip_buffer = BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for idx, image_info in enumerate(images):
-                    image_path = image_info.get('path')
-                    if os.path.exists(image_path):
-                        # ZIP 내부 파일명 생성
-                        archive_name = self._generate_filename(image_info, idx)
-                        zip_file.write(image_path, archive_name)
-                        
-            zip_buffer.seek(0)
-            return zip_buffer.read()
+            file_specs = []
+            for idx, image_info in enumerate(images):
+                image_stat = image_info.get('_stat')
+                if image_stat is not None:
+                    # ZIP 내부 파일명 생성
+                    archive_name = self._generate_filename(image_info, idx)
+                    file_specs.append((image_info['path'], image_stat.st_mtime, image_stat.st_size, archive_name))
+                    
+            return _build_zip(tuple(file_specs))
             
         except Exception as e:
             st.error(f"ZIP 파일 생성 오류: {str(e)}")
@@ -181,8 +309,12 @@ class ImageGallery:
         if base_name:
             return base_name
             
-        # 파일명이 없을 경우 자동 생성
-        timestamp = image_info.get('created_at', datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+        # 파일명이 없을 경우 자동 생성 (현재 시각 대신 파일 수정 시각을 써서 ZIP 캐시 키가 rerun마다 바뀌지 않게 함)
+        timestamp = image_info.get('created_at')
+        if not timestamp:
+            image_stat = image_info.get('_stat')
+            mtime = image_stat.st_mtime if image_stat is not None else os.path.getmtime(image_info['path'])
+            timestamp = datetime.datetime.fromtimestamp(mtime).strftime("%Y%m%d_%H%M%S")
         scene_number = image_info.get('scene_number', 0)
         
         return f"scene{scene_number}_image{index + 1}_{timestamp}.png"
@@ -190,20 +322,23 @@ class ImageGallery:
 
 def show_image_preview_modal(image_path: str, title: str = "이미지 미리보기"):
     """이미지 미리보기 모달 표시 (Streamlit 방식)"""
-    if os.path.exists(image_path):
-        image = Image.open(image_path)
-        st.image(image, caption=title, use_container_width=True)
-    else:
+    try:
+        # with 블록을 벗어나면 파일 핸들과 디코딩된 픽셀을 바로 해제
+        with Image.open(image_path) as image:
+            st.image(image, caption=title, use_container_width=True)
+    except FileNotFoundError:
         st.error("이미지를 찾을 수 없습니다.")
         
 
 def create_download_link(file_path: str, link_text: str = "다운로드") -> str:
-    """파일 다운로드 링크 생성 (대체 방법)"""
+    """파일 다운로드 링크 생성 (대체 방법, 가능하면 st.download_button 사용)"""
     try:
+        # 3의 배수 크기로 나눠 인코딩하면 청크를 이어 붙여도 패딩이 중간에 생기지 않음
+        b64 = StringIO()
         with open(file_path, "rb") as f:
-            data = f.read()
-        b64 = base64.b64encode(data).decode()
-        href = f'<a href="data:application/octet-stream;base64,{b64}" download="{os.path.basename(file_path)}">{link_text}</a>'
+            for chunk in iter(lambda: f.read(3 * (1 << 16)), b""):
+                b64.write(base64.b64encode(chunk).decode("ascii"))
+        href = f'<a href="data:application/octet-stream;base64,{b64.getvalue()}" download="{os.path.basename(file_path)}">{link_text}</a>'
         return href
     except Exception as e:
         return f"다운로드 링크 생성 실패: {str(e)}"
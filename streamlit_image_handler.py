@@ -9,12 +9,13 @@ import time
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple, Any
 import os
-import json
+import orjson
 from pathlib import Path
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
-from queue import Queue
+from collections import deque
+from functools import cached_property
 
 from imgCreator import (
     ImageCreator,
@@ -26,46 +27,105 @@ from imgCreator import (
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+LOG_LEVEL_ICONS = {
+    "info": "ℹ️",
+    "success": "✅",
+    "warning": "⚠️",
+    "error": "❌"
+}
+
 class StreamlitImageHandler:
     """Streamlit 환경에서 이미지 생성을 관리하는 핸들러"""
     
     def __init__(self):
-        self.image_creator = ImageCreator()
-        self.log_queue = Queue()
+        self.log_queue = deque(maxlen=200)  # 최근 로그만 유지하는 링 버퍼
+        self._log_lock = threading.Lock()
+        self._last_log_render = 0.0
+        self._log_text = ""
+        self._last_progress_update = 0.0
         self.current_status = {}
-        self.rate_limit_delay = 12  # 12초 대기
+        self.images_per_minute = 5  # 분당 요청 한도
+        self.rate_tokens = threading.Semaphore(self.images_per_minute)
+        
+    @cached_property
+    def image_creator(self) -> ImageCreator:
+        """첫 이미지 요청 시점에 ImageCreator 생성"""
+        return ImageCreator()
         
     def add_log(self, message: str, level: str = "info"):
-        """로그 메시지를 큐에 추가"""
+        """로그 메시지를 링 버퍼에 추가 (워커 스레드에서도 호출됨)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = {
-            "timestamp": timestamp,
-            "level": level,
-            "message": message
-        }
-        self.log_queue.put(log_entry)
+        log_entry = f"{timestamp} {LOG_LEVEL_ICONS.get(level, '📝')} {message}"
+        with self._log_lock:
+            self.log_queue.append(log_entry)
         
     def update_status(self, key: str, value: Any):
         """상태 업데이트"""
         self.current_status[key] = value
         
     def handle_rate_limit(self, container):
-        """Rate limit 대기 시각화"""
-        self.add_log(f"Rate limit 대기 중... ({self.rate_limit_delay}초)", "warning")
-        
-        progress_bar = container.progress(0)
+        """Rate limit 토큰 획득 (분당 한도가 남아 있으면 대기 없이 통과)"""
+        if self.rate_tokens.acquire(blocking=False):
+            self._schedule_token_release()
+            return
+            
+        self.add_log("Rate limit 대기 중... (최대 60초)", "warning")
         status_text = container.empty()
+        status_text.text("⏳ Rate limit 대기 중... 분당 요청 한도가 회복되면 자동으로 진행됩니다")
+        
+        # 초 단위 위젯 갱신 없이 토큰이 반환될 때까지 한 번만 대기
+        self._acquire_rate_token()
         
-        for i in range(self.rate_limit_delay):
-            progress = (i + 1) / self.rate_limit_delay
-            progress_bar.progress(progress)
-            status_text.text(f"⏳ Rate limit 대기 중... {self.rate_limit_delay - i}초 남음")
-            time.sleep(1)
-            
-        progress_bar.empty()
         status_text.empty()
         self.add_log("Rate limit 대기 완료", "info")
         
+    def _set_progress(self, progress_bar, status_text, value: int, text: str):
+        """진행률/상태 텍스트 갱신 (100ms 이내 연속 갱신은 건너뛰고 완료는 항상 반영)"""
+        now = time.monotonic()
+        if now - self._last_progress_update > 0.1 or value >= 100:
+            progress_bar.progress(value)
+            status_text.text(text)
+            self._last_progress_update = now
+        
+    def _acquire_rate_token(self):
+        """분당 요청 한도 토큰 획득 (토큰은 60초 후 자동 반환)"""
+        self.rate_tokens.acquire()
+        self._schedule_token_release()
+        
+    def _schedule_token_release(self):
+        """획득한 토큰을 60초 후 반환"""
+        timer = threading.Timer(60, self.rate_tokens.release)
+        timer.daemon = True
+        timer.start()
+        
+    def _create_image_rate_limited(
+        self,
+        prompt: str,
+        output_dir: str,
+        quality: str,
+        size: str,
+        style: str
+    ) -> Optional[str]:
+        """워커 스레드에서 토큰을 받아 이미지 생성 (Streamlit 위젯은 메인 스레드에서만 갱신)"""
+        self._acquire_rate_token()
+        
+        try:
+            self.add_log(f"이미지 생성 시작: '{prompt[:50]}...'", "info")
+            result = create_single_image(
+                prompt=prompt,
+                output_dir=output_dir,
+                quality=quality,
+                size=size,
+                style=style
+            )
+            if result:
+                self.add_log(f"이미지 저장 완료: {result}", "success")
+            return result
+            
+        except Exception as e:
+            self.add_log(f"에러 발생: {str(e)}", "error")
+            return None
+        
     def create_single_image_with_progress(
         self,
         prompt: str,
@@ -90,8 +150,7 @@ class StreamlitImageHandler:
                 status_text = status.empty()
                 
                 # 이미지 생성 요청
-                status_text.text("🎨 DALL-E 3 API 요청 중...")
-                progress_bar.progress(30)
+                self._set_progress(progress_bar, status_text, 30, "🎨 DALL-E 3 API 요청 중...")
                 
                 result = create_single_image(
                     prompt=prompt,
@@ -102,12 +161,9 @@ class StreamlitImageHandler:
                 )
                 
                 if result:
-                    progress_bar.progress(90)
-                    status_text.text("✅ 이미지 생성 완료!")
-                    self.add_log(f"이미지 저장 완료: {result}", "success")
-                    
                     # 완료
-                    progress_bar.progress(100)
+                    self._set_progress(progress_bar, status_text, 100, "✅ 이미지 생성 완료!")
+                    self.add_log(f"이미지 저장 완료: {result}", "success")
                     status.update(label="✅ 이미지 생성 완료", state="complete", expanded=False)
                     
                     # 이미지 미리보기
@@ -131,53 +187,53 @@ class StreamlitImageHandler:
         quality: str = "standard",
         size: str = "1024x1024",
         style: str = "vivid",
-        max_workers: int = 1
+        max_workers: int = 5
     ) -> List[Optional[str]]:
-        """여러 이미지 생성 with 진행률 표시"""
+        """여러 이미지 생성 with 진행률 표시 (분당 한도 내에서 동시 요청)"""
         
-        results = []
         total_prompts = len(prompts)
+        results = [None] * total_prompts
+        success_count = 0
+        fail_count = 0
         
         with container.container():
             # 전체 진행률
             overall_progress = st.progress(0, text=f"전체 진행률: 0/{total_prompts}")
             
+            # 성공/실패 카운트 (위젯 하나를 갱신)
+            status_placeholder = st.empty()
+            
             # 개별 이미지 상태 표시
             status_container = st.container()
             
-            for idx, prompt in enumerate(prompts):
-                with status_container.container():
-                    st.write(f"**이미지 {idx + 1}/{total_prompts}**")
-                    
-                    # Rate limit 처리 (첫 번째 이미지가 아닌 경우)
-                    if idx > 0:
-                        rate_limit_container = st.container()
-                        self.handle_rate_limit(rate_limit_container)
-                    
-                    # 이미지 생성
-                    image_container = st.container()
-                    result = self.create_single_image_with_progress(
-                        prompt=prompt,
-                        output_dir=output_dir,
-                        container=image_container,
-                        quality=quality,
-                        size=size,
-                        style=style
-                    )
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self._create_image_rate_limited, prompt, output_dir, quality, size, style): idx
+                    for idx, prompt in enumerate(prompts)
+                }
+                
+                # 완료되는 순서대로 메인 스레드에서 표시
+                for completed, future in enumerate(as_completed(futures), 1):
+                    idx = futures[future]
+                    result = future.result()
+                    results[idx] = result
+                    success_count += result is not None
+                    fail_count += result is None
                     
-                    results.append(result)
+                    with status_container.container():
+                        st.write(f"**이미지 {idx + 1}/{total_prompts}**")
+                        if result:
+                            st.image(result, caption=f"생성된 이미지: {os.path.basename(result)}")
+                        else:
+                            st.error("❌ 이미지 생성 실패")
                     
                     # 전체 진행률 업데이트
-                    progress = (idx + 1) / total_prompts
+                    progress = completed / total_prompts
                     overall_progress.progress(
                         progress,
-                        text=f"전체 진행률: {idx + 1}/{total_prompts} ({int(progress * 100)}%)"
+                        text=f"전체 진행률: {completed}/{total_prompts} ({int(progress * 100)}%)"
                     )
-                    
-                    # 성공/실패 카운트
-                    success_count = sum(1 for r in results if r is not None)
-                    fail_count = len(results) - success_count
-                    st.info(f"✅ 성공: {success_count} | ❌ 실패: {fail_count}")
+                    status_placeholder.info(f"✅ 성공: {success_count} | ❌ 실패: {fail_count}")
                     
         return results
         
@@ -206,10 +262,9 @@ class StreamlitImageHandler:
                 remaining_failures = []
                 
                 for idx, prompt in failed_prompts:
-                    # Rate limit 처리
-                    if len(retry_results) > 0:
-                        rate_limit_container = st.container()
-                        self.handle_rate_limit(rate_limit_container)
+                    # Rate limit 처리 (한도가 남아 있으면 바로 진행)
+                    rate_limit_container = st.container()
+                    self.handle_rate_limit(rate_limit_container)
                     
                     # 재시도
                     retry_container = st.container()
@@ -243,24 +298,22 @@ class StreamlitImageHandler:
         return retry_results
         
     def display_logs(self, container, max_logs: int = 50):
-        """실시간 로그 표시"""
-        logs = []
-        
-        # 큐에서 로그 가져오기
-        while not self.log_queue.empty() and len(logs) < max_logs:
-            logs.append(self.log_queue.get())
-        
-        if logs:
+        """실시간 로그 표시 (로그 텍스트는 0.5초에 한 번만 다시 만들고, 표시는 매번 수행)"""
+        now = time.monotonic()
+        if now - self._last_log_render >= 0.5:
+            self._last_log_render = now
+            
+            # 잠금 구간은 스냅샷 복사만
+            with self._log_lock:
+                logs = list(self.log_queue)[-max_logs:]
+            # 최신 로그가 위
+            self._log_text = "\n".join(reversed(logs))
+        
+        # 이번 실행에서 그리지 않은 요소는 Streamlit이 제거하므로 스냅샷은 항상 표시
+        if self._log_text:
             with container.expander("📋 실행 로그", expanded=False):
-                for log in reversed(logs[-max_logs:]):
-                    level_icon = {
-                        "info": "ℹ️",
-                        "success": "✅",
-                        "warning": "⚠️",
-                        "error": "❌"
-                    }.get(log["level"], "📝")
-                    
-                    st.text(f"{log['timestamp']} {level_icon} {log['message']}")
+                # 로그 전체를 위젯 하나로 표시
+                st.code(self._log_text, language=None)
                     
     def get_generation_summary(self, results: List[Optional[str]]) -> Dict[str, Any]:
         """생성 결과 요약"""
@@ -304,13 +357,19 @@ class StreamlitImageHandler:
             
         # 리포트 파일 저장
         report_path = os.path.join(output_dir, "generation_report.json")
-        with open(report_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        Path(report_path).write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             
         self.add_log(f"생성 리포트 저장: {report_path}", "info")
         return report_path
 
 
+def get_handler() -> StreamlitImageHandler:
+    """세션당 하나의 핸들러를 rerun 간에 재사용"""
+    if "image_handler" not in st.session_state:
+        st.session_state.image_handler = StreamlitImageHandler()
+    return st.session_state.image_handler
+
+
 # Streamlit 컴포넌트 헬퍼 함수들
 def create_image_generation_ui():
     """이미지 생성 UI 컴포넌트"""
@@ -383,7 +442,7 @@ def example_usage():
     st.title("AI 이미지 생성 도구")
     
     # 핸들러 초기화
-    handler = StreamlitImageHandler()
+    handler = get_handler()
     
     # UI 생성
     quality, size, style = create_image_generation_ui()
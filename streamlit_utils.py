@@ -2,17 +2,28 @@
 Streamlit utilities for content creator application
 """
 
+import base64
+import io
 import os
 import json
+import re
 import shutil
 import tempfile
+import time
 import logging
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 import streamlit as st
 from functools import wraps
 import traceback
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json 사용
+    orjson = None
 
 
 # ===== 설정 및 상수 정의 =====
@@ -20,6 +31,13 @@ DEFAULT_TEMP_DIR = "temp"
 LOG_DIR = "logs"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+_FMT = "%Y%m%d_%H%M%S"
+
+# 세션에 보관할 최대 에러 로그 수
+MAX_ERROR_LOG = 50
+
+# 업로드 파일 저장 시 복사 버퍼 크기
+UPLOAD_COPY_BUFFER = 4 * 1024 * 1024
 
 # 파일 크기 제한
 MAX_FILE_SIZE_MB = 100
@@ -31,6 +49,15 @@ SUPPORTED_AUDIO_FORMATS = ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a']
 SUPPORTED_IMAGE_FORMATS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
 SUPPORTED_DOCUMENT_FORMATS = ['.txt', '.pdf', '.docx', '.doc', '.pptx', '.ppt']
 
+# 파일명/API 키 검사용 정규식 (모듈 로드 시 한 번만 컴파일)
+_SANITIZE_BAD = re.compile(r'[<>:"/\\|?*]')
+_SANITIZE_UND = re.compile(r'_+')
+_API_KEY_PATTERNS = {
+    'openai': re.compile(r'^sk-[a-zA-Z0-9]{48}$'),
+    'anthropic': re.compile(r'^sk-ant-[a-zA-Z0-9]{95}$'),
+    'google': re.compile(r'^[a-zA-Z0-9\-_]{39}$')
+}
+
 # Session state 기본 키
 SESSION_KEYS = {
     'user_data': 'user_data',
@@ -83,26 +110,35 @@ def handle_errors(func):
             return func(*args, **kwargs)
         except Exception as e:
             error_msg = f"Error in {func.__name__}: {str(e)}"
-            logger.error(f"{error_msg}\n{traceback.format_exc()}")
             
-            # Session state에 에러 로그 추가
-            if 'error_log' not in st.session_state:
-                st.session_state.error_log = []
+            # 스택 트레이스 포맷팅은 비용이 크므로 디버그 모드에서만 한 번 수행
+            debug_mode = st.session_state.get('debug_mode', False)
+            tb = traceback.format_exc() if debug_mode else ''
+            if tb:
+                logger.error("%s\n%s", error_msg, tb)
+            else:
+                logger.error(error_msg)
+            
+            # Session state에 에러 로그 추가 (deque가 최근 MAX_ERROR_LOG개만 유지)
+            if not isinstance(st.session_state.get('error_log'), deque):
+                st.session_state.error_log = deque(
+                    st.session_state.get('error_log') or [], maxlen=MAX_ERROR_LOG
+                )
             
             st.session_state.error_log.append({
                 'timestamp': datetime.now().isoformat(),
                 'function': func.__name__,
                 'error': str(e),
-                'traceback': traceback.format_exc()
+                'traceback': tb
             })
             
             # Streamlit 에러 메시지 표시
             st.error(f"오류가 발생했습니다: {str(e)}")
             
             # 디버그 모드에서는 상세 정보 표시
-            if st.session_state.get('debug_mode', False):
+            if debug_mode:
                 with st.expander("오류 상세 정보"):
-                    st.code(traceback.format_exc())
+                    st.code(tb)
             
             return None
     return wrapper
@@ -113,19 +149,20 @@ class FileManager:
     """파일 관리를 위한 유틸리티 클래스"""
     
     @staticmethod
-    @handle_errors
-    def create_temp_dir(prefix: str = "content_") -> str:
+    def create_temp_dir(prefix: str = "content_") -> Optional[str]:
         """임시 디렉토리 생성"""
-        temp_dir = Path(DEFAULT_TEMP_DIR)
-        temp_dir.mkdir(exist_ok=True)
-        
-        # 고유한 임시 폴더 생성
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        temp_path = temp_dir / f"{prefix}{timestamp}"
-        temp_path.mkdir(exist_ok=True)
+        try:
+            temp_dir = Path(DEFAULT_TEMP_DIR)
+            temp_dir.mkdir(exist_ok=True)
+            
+            # 고유한 임시 폴더 생성 (난수 접미사로 같은 초에 만들어도 충돌 없음)
+            temp_path = tempfile.mkdtemp(prefix=prefix, dir=temp_dir)
+        except OSError as e:
+            logger.error("Failed to create temp directory: %s", e)
+            return None
         
-        logger.info(f"Created temp directory: {temp_path}")
-        return str(temp_path)
+        logger.info("Created temp directory: %s", temp_path)
+        return temp_path
     
     @staticmethod
     @handle_errors
@@ -134,20 +171,20 @@ class FileManager:
         temp_path = Path(temp_path)
         
         if not temp_path.exists():
-            logger.warning(f"Temp directory not found: {temp_path}")
+            logger.warning("Temp directory not found: %s", temp_path)
             return False
         
         # 안전 확인: temp 디렉토리 내부인지 확인
         if not force and DEFAULT_TEMP_DIR not in str(temp_path):
-            logger.error(f"Safety check failed: {temp_path} is not in temp directory")
+            logger.error("Safety check failed: %s is not in temp directory", temp_path)
             return False
         
         try:
             shutil.rmtree(temp_path)
-            logger.info(f"Cleaned up temp directory: {temp_path}")
+            logger.info("Cleaned up temp directory: %s", temp_path)
             return True
         except Exception as e:
-            logger.error(f"Failed to cleanup temp directory: {e}")
+            logger.error("Failed to cleanup temp directory: %s", e)
             return False
     
     @staticmethod
@@ -161,39 +198,45 @@ class FileManager:
         cleaned_count = 0
         cutoff_time = datetime.now().timestamp() - (days * 24 * 60 * 60)
         
-        for item in temp_dir.iterdir():
-            if item.is_dir() and item.stat().st_mtime < cutoff_time:
-                if FileManager.cleanup_temp_dir(item, force=True):
-                    cleaned_count += 1
+        # scandir의 DirEntry는 디렉토리 여부를 캐시하므로 항목당 stat 호출이 줄어듦
+        with os.scandir(temp_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff_time:
+                    if FileManager.cleanup_temp_dir(entry.path, force=True):
+                        cleaned_count += 1
         
-        logger.info(f"Cleaned up {cleaned_count} old temp directories")
+        logger.info("Cleaned up %s old temp directories", cleaned_count)
         return cleaned_count
     
     @staticmethod
-    @handle_errors
     def save_uploaded_file(uploaded_file, destination_dir: Union[str, Path]) -> Optional[str]:
         """업로드된 파일 저장"""
         if uploaded_file is None:
             return None
         
         destination_dir = Path(destination_dir)
-        destination_dir.mkdir(parents=True, exist_ok=True)
-        
         file_path = destination_dir / uploaded_file.name
         
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        try:
+            destination_dir.mkdir(parents=True, exist_ok=True)
+            # 업로드 파일 전체를 한 번에 쓰지 않고 4MB 단위로 복사
+            uploaded_file.seek(0)
+            with open(file_path, "wb", buffering=UPLOAD_COPY_BUFFER) as f:
+                shutil.copyfileobj(uploaded_file, f, length=UPLOAD_COPY_BUFFER)
+        except OSError as e:
+            logger.error("Failed to save uploaded file: %s", e)
+            return None
         
-        logger.info(f"Saved uploaded file: {file_path}")
+        logger.info("Saved uploaded file: %s", file_path)
         return str(file_path)
     
     @staticmethod
     def get_file_size_mb(file_path: Union[str, Path]) -> float:
         """파일 크기를 MB로 반환"""
-        file_path = Path(file_path)
-        if not file_path.exists():
+        try:
+            return Path(file_path).stat().st_size / (1024 * 1024)
+        except OSError:
             return 0.0
-        return file_path.stat().st_size / (1024 * 1024)
     
     @staticmethod
     def is_valid_file_type(file_path: Union[str, Path], allowed_formats: List[str]) -> bool:
@@ -215,7 +258,7 @@ class SessionStateManager:
                 SESSION_KEYS['project_data']: {},
                 SESSION_KEYS['current_step']: 0,
                 SESSION_KEYS['temp_files']: [],
-                SESSION_KEYS['error_log']: [],
+                SESSION_KEYS['error_log']: deque(maxlen=MAX_ERROR_LOG),
                 SESSION_KEYS['settings']: {
                     'debug_mode': False,
                     'auto_cleanup': True,
@@ -226,7 +269,7 @@ class SessionStateManager:
         for key, value in defaults.items():
             if key not in st.session_state:
                 st.session_state[key] = value
-                logger.debug(f"Initialized session state key: {key}")
+                logger.debug("Initialized session state key: %s", key)
     
     @staticmethod
     def get_value(key: str, default: Any = None) -> Any:
@@ -237,7 +280,7 @@ class SessionStateManager:
     def set_value(key: str, value: Any) -> None:
         """Session state 값 설정"""
         st.session_state[key] = value
-        logger.debug(f"Set session state: {key} = {value}")
+        logger.debug("Set session state: %s = %s", key, value)
     
     @staticmethod
     def update_value(key: str, updates: Dict[str, Any]) -> None:
@@ -247,16 +290,16 @@ class SessionStateManager:
         
         if isinstance(st.session_state[key], dict):
             st.session_state[key].update(updates)
-            logger.debug(f"Updated session state: {key}")
+            logger.debug("Updated session state: %s", key)
         else:
-            logger.error(f"Cannot update non-dict session state: {key}")
+            logger.error("Cannot update non-dict session state: %s", key)
     
     @staticmethod
     def clear_value(key: str) -> None:
         """Session state 값 삭제"""
         if key in st.session_state:
             del st.session_state[key]
-            logger.debug(f"Cleared session state: {key}")
+            logger.debug("Cleared session state: %s", key)
     
     @staticmethod
     def reset_all() -> None:
@@ -266,87 +309,100 @@ class SessionStateManager:
         logger.info("Reset all session state")
     
     @staticmethod
-    @handle_errors
     def export_session_data() -> Dict[str, Any]:
         """Session state 데이터 내보내기"""
         export_data = {}
         for key in SESSION_KEYS.values():
             if key in st.session_state:
-                export_data[key] = st.session_state[key]
+                value = st.session_state[key]
+                # deque는 JSON 직렬화를 위해 리스트로 변환
+                export_data[key] = list(value) if isinstance(value, deque) else value
         
         export_data['export_timestamp'] = datetime.now().isoformat()
         return export_data
     
     @staticmethod
-    @handle_errors
     def import_session_data(data: Dict[str, Any]) -> bool:
         """Session state 데이터 가져오기"""
         try:
             for key, value in data.items():
+                if key == SESSION_KEYS['error_log']:
+                    value = deque(value or [], maxlen=MAX_ERROR_LOG)
                 if key != 'export_timestamp':
                     st.session_state[key] = value
             logger.info("Imported session data successfully")
             return True
         except Exception as e:
-            logger.error(f"Failed to import session data: {e}")
+            logger.error("Failed to import session data: %s", e)
             return False
 
 
 # ===== JSON 데이터 처리 =====
+def _json_dumps(data: Any, indent: Optional[int] = 2) -> bytes:
+    """JSON 직렬화 (orjson 사용 시 들여쓰기는 2칸 고정)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    """JSON 역직렬화"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class JsonHandler:
     """JSON 데이터 처리 유틸리티"""
     
     @staticmethod
-    @handle_errors
     def save_json(data: Any, file_path: Union[str, Path], indent: int = 2) -> bool:
         """JSON 파일 저장"""
         file_path = Path(file_path)
-        file_path.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=indent)
-            logger.info(f"Saved JSON file: {file_path}")
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(_json_dumps(data, indent))
+            logger.info("Saved JSON file: %s", file_path)
             return True
         except Exception as e:
-            logger.error(f"Failed to save JSON file: {e}")
+            logger.error("Failed to save JSON file: %s", e)
             return False
     
     @staticmethod
-    @handle_errors
     def load_json(file_path: Union[str, Path]) -> Optional[Any]:
         """JSON 파일 로드"""
         file_path = Path(file_path)
         
-        if not file_path.exists():
-            logger.warning(f"JSON file not found: {file_path}")
-            return None
-        
+        # exists() 확인 없이 바로 읽고, 파일이 없으면 예외로 처리
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            logger.info(f"Loaded JSON file: {file_path}")
+            data = _json_loads(file_path.read_bytes())
+            logger.info("Loaded JSON file: %s", file_path)
             return data
+        except FileNotFoundError:
+            logger.warning("JSON file not found: %s", file_path)
+            return None
         except Exception as e:
-            logger.error(f"Failed to load JSON file: {e}")
+            logger.error("Failed to load JSON file: %s", e)
             return None
     
     @staticmethod
     def to_json_string(data: Any, indent: int = 2) -> str:
         """데이터를 JSON 문자열로 변환"""
         try:
-            return json.dumps(data, ensure_ascii=False, indent=indent)
+            return _json_dumps(data, indent).decode('utf-8')
         except Exception as e:
-            logger.error(f"Failed to convert to JSON string: {e}")
+            logger.error("Failed to convert to JSON string: %s", e)
             return "{}"
     
     @staticmethod
     def from_json_string(json_str: str) -> Optional[Any]:
         """JSON 문자열을 데이터로 변환"""
         try:
-            return json.loads(json_str)
+            return _json_loads(json_str)
         except Exception as e:
-            logger.error(f"Failed to parse JSON string: {e}")
+            logger.error("Failed to parse JSON string: %s", e)
             return None
 
 
@@ -357,15 +413,16 @@ def create_download_link(file_path: Union[str, Path], link_text: str = "다운
     file_path = Path(file_path)
     
     if not file_path.exists():
-        logger.error(f"File not found for download: {file_path}")
+        logger.error("File not found for download: %s", file_path)
         return ""
     
-    with open(file_path, "rb") as f:
-        file_data = f.read()
+    # 3바이트 배수 청크 단위로 인코딩해 원본 전체를 메모리에 올리지 않음
+    b64 = io.StringIO()
+    with open(file_path, "rb", buffering=1 << 20) as f:
+        while chunk := f.read(3 * 1024 * 1024):
+            b64.write(base64.b64encode(chunk).decode("ascii"))
     
-    import base64
-    b64 = base64.b64encode(file_data).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{file_path.name}">{link_text}</a>'
+    href = f'<a href="data:application/octet-stream;base64,{b64.getvalue()}" download="{file_path.name}">{link_text}</a>'
     
     return href
 
@@ -381,19 +438,21 @@ def format_file_size(size_bytes: int) -> str:
 
 def sanitize_filename(filename: str) -> str:
     """파일명 정리 (특수문자 제거)"""
-    import re
     # 파일명에 사용할 수 없는 문자 제거
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    sanitized = _SANITIZE_BAD.sub('_', filename)
     # 연속된 언더스코어를 하나로
-    sanitized = re.sub(r'_+', '_', sanitized)
+    sanitized = _SANITIZE_UND.sub('_', sanitized)
     # 앞뒤 공백 및 점 제거
     sanitized = sanitized.strip('. ')
     
     return sanitized or "unnamed"
 
 
-def get_timestamp_string(format_str: str = "%Y%m%d_%H%M%S") -> str:
+def get_timestamp_string(format_str: str = _FMT) -> str:
     """타임스탬프 문자열 생성"""
+    # 기본 형식은 time.strftime으로 충분하고, 사용자 형식은 %f 등 datetime 전용 지시자를 위해 datetime 사용
+    if format_str == _FMT:
+        return time.strftime(_FMT)
     return datetime.now().strftime(format_str)
 
 
@@ -404,16 +463,9 @@ def validate_api_key(api_key: str, service: str) -> bool:
         return False
     
     # 서비스별 API 키 패턴 (예시)
-    patterns = {
-        'openai': r'^sk-[a-zA-Z0-9]{48}$',
-        'anthropic': r'^sk-ant-[a-zA-Z0-9]{95}$',
-        'google': r'^[a-zA-Z0-9\-_]{39}$'
-    }
-    
-    pattern = patterns.get(service.lower())
+    pattern = _API_KEY_PATTERNS.get(service.lower())
     if pattern:
-        import re
-        return bool(re.match(pattern, api_key))
+        return bool(pattern.match(api_key))
     
     # 기본적인 길이 확인
     return len(api_key) >= 20
@@ -461,7 +513,7 @@ class DebugHelper:
         error_log = st.session_state.get('error_log', [])
         if error_log:
             with st.expander(f"❌ Error Log ({len(error_log)} errors)"):
-                for i, error in enumerate(reversed(error_log[-10:])):  # 최근 10개만
+                for i, error in enumerate(islice(reversed(error_log), 10)):  # 최근 10개만
                     st.write(f"**Error {i+1}:**")
                     st.write(f"- Time: {error['timestamp']}")
                     st.write(f"- Function: {error['function']}")
@@ -475,13 +527,12 @@ class DebugHelper:
         """함수 실행 시간 측정 데코레이터"""
         @wraps(func)
         def wrapper(*args, **kwargs):
-            import time
             start_time = time.time()
             result = func(*args, **kwargs)
             end_time = time.time()
             
             execution_time = end_time - start_time
-            logger.debug(f"{func.__name__} executed in {execution_time:.4f} seconds")
+            logger.debug("%s executed in %.4f seconds", func.__name__, execution_time)
             
             if st.session_state.get('debug_mode', False):
                 st.caption(f"⏱️ {func.__name__}: {execution_time:.4f}s")
@@ -518,7 +569,7 @@ class SettingsManager:
         settings = SettingsManager.get_settings()
         settings.update(updates)
         st.session_state[SESSION_KEYS['settings']] = settings
-        logger.info(f"Updated settings: {updates}")
+        logger.info("Updated settings: %s", updates)
     
     @staticmethod
     def reset_settings() -> None:
@@ -550,12 +601,15 @@ def initialize_app() -> None:
     # Session state 초기화
     SessionStateManager.init_session_state()
     
+    # 설정은 한 번만 읽어서 재사용
+    settings = SettingsManager.get_settings()
+    
     # 오래된 임시 파일 정리
-    if SettingsManager.get_settings().get('auto_cleanup', True):
+    if settings.get('auto_cleanup', True):
         FileManager.cleanup_old_temp_files()
     
     # 로깅 레벨 설정
-    log_level = SettingsManager.get_settings().get('log_level', 'INFO')
+    log_level = settings.get('log_level', 'INFO')
     logger.setLevel(getattr(logging, log_level))
     
     logger.info("Application initialized")
@@ -1,38 +1,51 @@
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-import pandas as pd
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 import json
-import concurrent.futures
+import orjson
+import asyncio
+from itertools import zip_longest
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # .env 파일 로드
 load_dotenv()
 
-def get_spreadsheet_data(sheet_url, sheet_name):
+@lru_cache(maxsize=1)
+def _get_gspread_client(credentials_path='credentials.json'):
     # API 범위 설정
     scope = ['https://spreadsheets.google.com/feeds',
              'https://www.googleapis.com/auth/drive']
     
     # 서비스 계정 인증 정보 (JSON 파일)
     credentials = ServiceAccountCredentials.from_json_keyfile_name(
-        'credentials.json', scope)
+        credentials_path, scope)
     
-    gc = gspread.authorize(credentials)
-    sheet = gc.open_by_url(sheet_url)
-    worksheet = sheet.worksheet(sheet_name)
-    data = worksheet.get_all_records()
+    return gspread.authorize(credentials)
 
-    df = pd.DataFrame(data)
-    
-    return df, worksheet, sheet
+@lru_cache(maxsize=8)
+def _open_spreadsheet(sheet_url):
+    # 같은 URL은 스프레드시트 메타데이터를 다시 조회하지 않음
+    return _get_gspread_client().open_by_url(sheet_url)
 
-def filtered_column(df, columns_name):
-    # 데이터프레임 복사
-    df = df.copy()
-    df = df[columns_name]
-    return df
+def get_spreadsheet_data(sheet_url, sheet_name, columns_name):
+    sheet = _open_spreadsheet(sheet_url)
+    worksheet = sheet.worksheet(sheet_name)
+    
+    # 시트 전체 대신 필요한 열만 한 번의 요청으로 가져오기
+    headers = worksheet.row_values(1)
+    col_letters = [col_num_to_letter(headers.index(name) + 1) for name in columns_name]
+    col_values = worksheet.batch_get([f"{letter}2:{letter}" for letter in col_letters])
+    
+    # 각 열을 셀 값 리스트로 변환 (빈 셀은 빈 리스트로 옴)
+    columns = [[cell[0] if cell else "" for cell in values] for values in col_values]
+    
+    # (행 번호, {열 이름: 값}) 형태로 반환, 행 번호는 헤더행 다음인 2부터 시작
+    rows = [
+        (row_index, dict(zip(columns_name, values)))
+        for row_index, values in enumerate(zip_longest(*columns, fillvalue=""), start=2)
+    ]
+    
+    return rows, worksheet, sheet
 
 # 쓰레드 안전성을 위한 OpenAI API 호출 함수 제거
 # openai_lock = threading.Lock()
@@ -44,29 +57,34 @@ def get_llm(model_name: str = "gpt-4o-mini"):
     Args:
         model_name (str): 사용할 모델 이름 ("gpt-4o-mini", "gemini-pro" 등)
     """
+    # 사용하는 제공자의 패키지만 로드
     if model_name.startswith("gemini"):
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(
             model=model_name,
             temperature=0
         )
     else:
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model_name=model_name,
             temperature=0
         )
 
-def analyst(system_prompt, user_prompt, model_name="gpt-4o-mini"):
+async def analyst(system_prompt, user_prompt, model_name="gpt-4o-mini", llm=None):
     """
-    AI 모델을 사용하여 분석을 수행하는 함수
+    AI 모델을 사용하여 비동기로 분석을 수행하는 함수
     
     Args:
         system_prompt (str): 시스템 프롬프트
         user_prompt (str): 사용자 프롬프트
         model_name (str): 사용할 모델 이름 (기본값: "gpt-4o-mini")
+        llm: 재사용할 LLM 인스턴스 (작업 전체에서 하나를 공유, 없으면 model_name으로 새로 생성)
     """
-    llm = get_llm(model_name)
+    if llm is None:
+        llm = get_llm(model_name)
     
-    response = llm.invoke(
+    response = await llm.ainvoke(
         [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -75,27 +93,56 @@ def analyst(system_prompt, user_prompt, model_name="gpt-4o-mini"):
     
     return response.content
 
-def process_row(data, system_prompt, model_name="gpt-4o-mini"):
-    # 네임드튜플에서 데이터 추출
-    row_dict = {col: getattr(data, col) for col in data._fields if col != 'Index'}
+async def process_row_async(slot, row_index, row_dict, system_prompt, llm):
+    # 데이터를 JSON 형태로 구조화 (LLM 입력이므로 들여쓰기 없이)
+    formatted_json = orjson.dumps(row_dict).decode('utf-8')
     
-    # 데이터를 JSON 형태로 구조화
-    formatted_json = json.dumps(row_dict, ensure_ascii=False, indent=2)
+    result = await analyst(system_prompt, formatted_json, llm=llm)
     
-    result = analyst(system_prompt, formatted_json, model_name)
+    # 결과와 행 인덱스, 결과 리스트 내 위치를 함께 반환
+    return {"result": result, "row_index": row_index, "slot": slot}
+
+async def _run_all(rows, system_prompt, llm, concurrency=32):
+    """세마포어로 동시 요청 수를 제한하며 모든 행을 비동기로 분석"""
+    sem = asyncio.Semaphore(concurrency)
     
-    # 결과와 행 인덱스를 함께 반환
-    return {"result": result, "row_index": data.Index + 2}  # +2는 헤더행(1) + 0-인덱스 보정(1)
+    async def _guarded(slot, row_index, row_dict):
+        async with sem:
+            try:
+                return await process_row_async(slot, row_index, row_dict, system_prompt, llm)
+            except Exception as exc:
+                print(f'행 {row_index} 처리 중 오류 발생: {exc}')
+                return None
+    
+    # 행 순서대로 결과를 넣을 자리를 미리 확보 (실패한 행은 None으로 남음)
+    total_result = [None] * len(rows)
+    
+    # 완료되는 순서대로 결과 수집
+    tasks = [_guarded(slot, row_index, row_dict) for slot, (row_index, row_dict) in enumerate(rows)]
+    for coro in asyncio.as_completed(tasks):
+        result = await coro
+        if result is not None:
+            total_result[result["slot"]] = result
+            print(f"행 {result['row_index']} 분석 완료")
+    
+    return total_result
 
-# 열 인덱스(숫자)를 스프레드시트 열 문자(A, B, ..., Z, AA, AB, ...)로 변환하는 함수
-def col_num_to_letter(n):
-    """숫자를 스프레드시트 열 문자로 변환 (1=A, 2=B, ..., 27=AA, ...)"""
+def _col_num_to_letter_slow(n):
+    """divmod 반복으로 열 문자 계산 (ZZ 이후 열용)"""
     result = ""
     while n > 0:
         n, remainder = divmod(n - 1, 26)
         result = chr(65 + remainder) + result
     return result
 
+# A부터 ZZ(702열)까지의 열 문자를 미리 계산해 둔 테이블
+_COL_LETTERS = tuple(_col_num_to_letter_slow(n) for n in range(1, 703))
+
+# 열 인덱스(숫자)를 스프레드시트 열 문자(A, B, ..., Z, AA, AB, ...)로 변환하는 함수
+def col_num_to_letter(n):
+    """숫자를 스프레드시트 열 문자로 변환 (1=A, 2=B, ..., 27=AA, ...)"""
+    return _COL_LETTERS[n - 1] if 1 <= n <= 702 else _col_num_to_letter_slow(n)
+
 def analyze_data_with_ai_and_update_sheet(input_url, input_sheet_name, input_columns_name, system_prompt, new_column_name, model_name="gpt-4o-mini"):
     """
     스프레드시트의 데이터를 AI로 분석하고 결과를 스프레드시트에 업데이트하는 함수
@@ -108,81 +155,67 @@ def analyze_data_with_ai_and_update_sheet(input_url, input_sheet_name, input_col
         new_column_name (str): 결과를 저장할 새 열 이름
         model_name (str): 사용할 AI 모델 이름 (기본값: "gpt-4o-mini")
     """
-    df, worksheet, sheet = get_spreadsheet_data(input_url, input_sheet_name)
-    filtered_df = filtered_column(df, input_columns_name)
+    rows, worksheet, sheet = get_spreadsheet_data(input_url, input_sheet_name, input_columns_name)
 
-    print(filtered_df)
-    
-    total_result = []
+    print(f"분석할 행 수: {len(rows)}")
     
-    # 멀티쓰레딩을 사용하여 병렬 처리
-    with concurrent.futures.ThreadPoolExecutor(max_workers=100) as executor:
-        # 각 행에 대한 작업 제출
-        future_to_row = {
-            executor.submit(process_row, data, system_prompt, model_name): data 
-            for data in filtered_df.itertuples()
-        }
-        
-        # 결과 수집
-        for future in concurrent.futures.as_completed(future_to_row):
-            try:
-                result = future.result()
-                total_result.append(result)
-                print(f"행 {result['row_index']} 분석 완료")
-            except Exception as exc:
-                data = future_to_row[future]
-                print(f'행 {data.Index + 2} 처리 중 오류 발생: {exc}')
-    
-    # 행 인덱스 기준으로 정렬
-    total_result.sort(key=lambda x: x["row_index"])
+    # 스레드 대신 하나의 LLM 클라이언트로 비동기 병렬 처리 (커넥션 풀 공유)
+    llm = get_llm(model_name)
+    total_result = asyncio.run(_run_all(rows, system_prompt, llm))
     
     try:
         # 스프레드시트 크기 확장 (열만)
         headers = worksheet.row_values(1)
         current_cols = len(headers)
         
-        # 새 컬럼이 없으면 확장 및 헤더 추가
+        # 업데이트할 셀 데이터 준비 (헤더와 결과를 한 번에 일괄 업데이트)
+        batch_data = []
+        
+        # 새 컬럼이 없으면 필요할 때만 확장하고 헤더 추가
         if new_column_name not in headers:
-            try:
-                # 열 개수 확장
-                sheet.batch_update({
-                    "requests": [
-                        {
-                            "updateSheetProperties": {
-                                "properties": {
-                                    "sheetId": worksheet.id,
-                                    "gridProperties": {
-                                        "columnCount": current_cols + 10
-                                    }
-                                },
-                                "fields": "gridProperties.columnCount"
+            col_index = current_cols + 1
+            
+            if worksheet.col_count < col_index:
+                try:
+                    # 열 개수 확장
+                    sheet.batch_update({
+                        "requests": [
+                            {
+                                "updateSheetProperties": {
+                                    "properties": {
+                                        "sheetId": worksheet.id,
+                                        "gridProperties": {
+                                            "columnCount": current_cols + 10
+                                        }
+                                    },
+                                    "fields": "gridProperties.columnCount"
+                                }
                             }
-                        }
-                    ]
-                })
-                print(f"스프레드시트 열 개수를 {current_cols}에서 {current_cols + 10}로 확장했습니다.")
-                
-                # 새 컬럼 헤더 추가
-                col_index = current_cols + 1
-                worksheet.update_cell(1, col_index, new_column_name)
-                print(f"새 열 '{new_column_name}'을(를) {col_index}번 위치에 추가했습니다.")
-                
-                # 헤더 다시 가져오기
-                headers = worksheet.row_values(1)
-            except Exception as e:
-                print(f"스프레드시트 확장 중 오류 발생: {e}")
-                raise
+                        ]
+                    })
+                    print(f"스프레드시트 열 개수를 {worksheet.col_count}에서 {current_cols + 10}로 확장했습니다.")
+                except Exception as e:
+                    print(f"스프레드시트 확장 중 오류 발생: {e}")
+                    raise
+            
+            # 새 컬럼 헤더는 결과 데이터와 같은 요청으로 기록
+            batch_data.append({
+                "range": f"{input_sheet_name}!{col_num_to_letter(col_index)}1",
+                "values": [[new_column_name]]
+            })
+            print(f"새 열 '{new_column_name}'을(를) {col_index}번 위치에 추가합니다.")
+        else:
+            col_index = headers.index(new_column_name) + 1
         
-        # 결과 데이터를 일괄 업데이트할 배치 요청 생성
-        col_index = headers.index(new_column_name) + 1
-        print(f"새 열의 인덱스: {col_index}, 열 문자: {col_num_to_letter(col_index)}")
+        # 결과 데이터를 일괄 업데이트할 배치 요청 생성 (열 문자는 모든 행에서 동일)
+        col_letter = col_num_to_letter(col_index)
+        print(f"새 열의 인덱스: {col_index}, 열 문자: {col_letter}")
         
-        # 업데이트할 셀 데이터 준비 (일괄 업데이트용)
-        batch_data = []
         for result_item in total_result:
+            if result_item is None:
+                continue
             cell_value = result_item["result"]
             row_index = result_item["row_index"]
-            col_letter = col_num_to_letter(col_index)
             
             batch_data.append({
                 "range": f"{input_sheet_name}!{col_letter}{row_index}",